@@ -0,0 +1,301 @@
+import io
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import ynab_format_csv
+from ynab_format_csv.api import convert, load_mapping
+from ynab_format_csv.dataclasses import FieldMapping
+from ynab_format_csv.exceptions import MappingError, TransactionFileError
+from ynab_format_csv.fileio import write_field_mappings_to_yaml
+from ynab_format_csv.validation import ValidationSummary
+
+RESOURCES_DIR = Path(__file__).parent.parent / "resources"
+
+
+@pytest.fixture
+def field_mappings():
+    """Create field mappings matching the sample CSV file"""
+    return [
+        FieldMapping(ynab_field="Date", csv_field="Date"),
+        FieldMapping(ynab_field="Payee", csv_field="Description"),
+        FieldMapping(ynab_field="Memo", csv_field="Skipped"),
+        FieldMapping(ynab_field="Amount", csv_field="Amount"),
+    ]
+
+
+@pytest.fixture
+def mixed_csv_file(tmp_path):
+    """Create a CSV file with one invalid row among valid ones"""
+    file_path = tmp_path / "mixed.csv"
+    file_path.write_text("Date,Description,Amount\n2023-01-01,Shop,-5.00\n,Missing,1.00\n2023-01-03,Pay,100\n")
+    return file_path
+
+
+def test_convert_yields_batches(sample_csv_file, field_mappings):
+    """Test converting a file into batches of YNAB rows"""
+    batches = list(convert(sample_csv_file, field_mappings, chunksize=1))
+
+    assert len(batches) == 2
+    df = pd.concat(batches)
+    assert list(df.columns) == ["Date", "Payee", "Amount"]
+    assert df["Amount"].tolist() == [-50.00, 100.00]
+
+
+def test_convert_mapping_file(sample_csv_file, sample_mapping_file, field_mappings):
+    """Test converting with the path to a saved mapping file"""
+    write_field_mappings_to_yaml(field_mappings, sample_mapping_file)
+
+    assert load_mapping(sample_mapping_file) == field_mappings
+    assert len(pd.concat(convert(sample_csv_file, sample_mapping_file))) == 2
+
+
+def test_convert_quarantine_and_summary(mixed_csv_file, field_mappings):
+    """Test that invalid rows are reported through the callback and summary"""
+    summary = ValidationSummary()
+    quarantined = []
+
+    df = pd.concat(convert(mixed_csv_file, field_mappings, summary=summary, on_invalid=quarantined.append))
+
+    assert df["Payee"].tolist() == ["Shop", "Pay"]
+    assert summary.valid_rows == 2
+    assert summary.invalid_rows == 1
+    assert pd.concat(quarantined)["Line"].tolist() == [3]
+
+
+def test_convert_quarantine_line_numbers(tmp_path, field_mappings):
+    """Test that quarantined rows report their line in the file, not their record number"""
+    file_path = tmp_path / "multiline.csv"
+    file_path.write_text('Date,Description,Amount\n\n2023-01-01,"Two\nlines",-5.00\n,Missing,1.00\n')
+    quarantined = []
+
+    list(convert(file_path, field_mappings, on_invalid=quarantined.append))
+
+    assert pd.concat(quarantined)["Line"].tolist() == [5]
+
+
+def test_convert_mapping_mismatch(sample_csv_file):
+    """Test that a mapping that doesn't match the file raises MappingError"""
+    with pytest.raises(MappingError):
+        list(convert(sample_csv_file, [FieldMapping(ynab_field="Date", csv_field="Nonexistent")]))
+
+
+def test_convert_missing_file(tmp_path, field_mappings):
+    """Test that a missing transaction file raises TransactionFileError"""
+    with pytest.raises(TransactionFileError):
+        list(convert(tmp_path / "missing.csv", field_mappings))
+
+
+def test_convert_has_no_stdout(capsys, sample_csv_file, field_mappings):
+    """Test that the library API does not print"""
+    list(convert(sample_csv_file, field_mappings))
+    assert capsys.readouterr().out == ""
+
+
+def test_package_exports():
+    """Test that the public API is available from the package"""
+    assert ynab_format_csv.convert is convert
+    assert issubclass(ynab_format_csv.MappingError, ynab_format_csv.YnabFormatError)
+
+
+def test_convert_collapse_pending(tmp_path, field_mappings):
+    """Test collapsing pending/posted pairs that span chunks"""
+    file_path = tmp_path / "pending.csv"
+    file_path.write_text("Date,Description,Amount\n2023-01-01,Shop,-5.00\n2023-01-02,Other,1.00\n2023-01-03,Shop,-5.00\n")
+
+    batches = list(convert(file_path, field_mappings, chunksize=1, collapse_pending=3))
+
+    assert len(batches) == 1
+    assert batches[0]["Payee"].tolist() == ["Other", "Shop"]
+
+
+def test_convert_split_by(tmp_path, field_mappings):
+    """Test carrying the split column through to the output batches"""
+    file_path = tmp_path / "joint.csv"
+    file_path.write_text("Account,Date,Description,Amount\n0238,2023-01-01,Shop,-5.00\n0500,2023-01-02,Pay,1.00\n")
+
+    df = pd.concat(convert(file_path, field_mappings, split_by="Account"))
+
+    assert list(df.columns) == ["Date", "Payee", "Amount", "Account"]
+    assert df["Account"].tolist() == ["0238", "0500"]
+
+
+def test_convert_split_mappings(tmp_path, field_mappings):
+    """Test mapping the rows of one split value with their own mapping, and the rest with the main one"""
+    file_path = tmp_path / "joint.csv"
+    file_path.write_text(
+        "Account,Date,Description,Amount,Debit,Credit\n"
+        "0238,2024-01-02,Shop,-5.00,,\n"
+        "0500,13/01/2024,Rent,,700,\n"
+        "0238,2024-01-03,Pay,100,,\n"
+        "0500,14/01/2024,Refund,,,20\n"
+    )
+    card_mappings = [
+        FieldMapping(ynab_field="Date", csv_field="Date"),
+        FieldMapping(ynab_field="Payee", csv_field="Description"),
+        FieldMapping(ynab_field="Outflow", csv_field="Debit"),
+        FieldMapping(ynab_field="Inflow", csv_field="Credit"),
+    ]
+
+    batches = list(
+        convert(
+            file_path,
+            field_mappings,
+            split_by="Account",
+            split_mappings={"0500": card_mappings},
+            since=date(2024, 1, 3),
+        )
+    )
+
+    assert len(batches) == 2
+    assert list(batches[0].columns) == ["Date", "Payee", "Amount", "Account"]
+    assert batches[0]["Payee"].tolist() == ["Pay"]
+    assert list(batches[1].columns) == ["Date", "Payee", "Outflow", "Inflow", "Account"]
+    assert batches[1]["Date"].tolist() == ["2024-01-13", "2024-01-14"]
+    assert batches[1]["Outflow"].fillna(0).tolist() == [700.0, 0.0]
+
+    with pytest.raises(MappingError):
+        list(convert(file_path, field_mappings, split_mappings={"0500": card_mappings}))
+
+
+def test_convert_split_by_missing_column(sample_csv_file, field_mappings):
+    """Test splitting by a column that isn't in the file"""
+    with pytest.raises(MappingError):
+        list(convert(sample_csv_file, field_mappings, split_by="Account"))
+
+
+def test_convert_date_range_stops_early(tmp_path, field_mappings):
+    """Test that reading stops once a sorted file has passed the date range"""
+    file_path = tmp_path / "sorted.csv"
+    file_path.write_text(
+        "Date,Description,Amount\n2023-01-01,A,1\n2023-01-02,B,2\n2023-01-03,C,3\n2023-01-04,D,4\n2023-01-05,E,5\n"
+    )
+    progress = []
+
+    df = pd.concat(
+        convert(
+            file_path,
+            field_mappings,
+            chunksize=1,
+            since=date(2023, 1, 2),
+            until=date(2023, 1, 3),
+            on_progress=lambda _, rows: progress.append(rows),
+        )
+    )
+
+    assert df["Payee"].tolist() == ["B", "C"]
+    assert progress[-1] == 4
+
+
+def test_convert_currency_requires_rate_table(sample_csv_file, field_mappings):
+    """Test that mapping a Currency field without a rate table is rejected"""
+    field_mappings.append(FieldMapping(ynab_field="Currency", csv_field="Description"))
+    with pytest.raises(MappingError):
+        list(convert(sample_csv_file, field_mappings))
+
+
+def test_convert_rate_table_requires_base_currency(tmp_path, sample_csv_file, field_mappings):
+    """Test that a rate table without the account's base currency is rejected"""
+    rate_file = tmp_path / "rates.csv"
+    rate_file.write_text("Date,Currency,Rate\n2023-01-01,EUR,1.1\n")
+    field_mappings.append(FieldMapping(ynab_field="Currency", csv_field="Description"))
+
+    with pytest.raises(MappingError, match="base currency"):
+        list(convert(sample_csv_file, field_mappings, fx_rates=rate_file))
+
+
+def test_convert_merges_files(tmp_path, mixed_csv_file, field_mappings):
+    """Test that several files are merged into one date-ordered sequence"""
+    february = tmp_path / "february.csv"
+    february.write_text("Date,Description,Amount\n2023-02-01,Rent,-900\n2023-01-02,Late,-1.50\n2023-01-03,Tie,2\n")
+    summary = ValidationSummary()
+    quarantined = []
+    progress = []
+
+    batches = list(
+        convert(
+            [february, mixed_csv_file],
+            field_mappings,
+            chunksize=2,
+            summary=summary,
+            on_invalid=quarantined.append,
+            on_progress=lambda bytes_read, rows: progress.append((bytes_read, rows)),
+        )
+    )
+
+    df = pd.concat(batches)
+    assert df["Payee"].tolist() == ["Shop", "Late", "Tie", "Pay", "Rent"]
+    assert df["Amount"].tolist() == [-5.0, -1.5, 2.0, 100.0, -900.0]
+    assert df.index.tolist() == [
+        (str(mixed_csv_file), 0),
+        (str(february), 1),
+        (str(february), 2),
+        (str(mixed_csv_file), 2),
+        (str(february), 0),
+    ]
+    assert summary.valid_rows == 5
+    assert quarantined[0]["File"].tolist() == ["mixed.csv"]
+    assert quarantined[0]["Line"].tolist() == [3]
+    assert progress[-1] == (february.stat().st_size + mixed_csv_file.stat().st_size, 6)
+
+
+def test_convert_file_object(field_mappings):
+    """Test converting an open file object rather than a path"""
+    source = io.StringIO("Date,Description,Amount\n2023-01-01,Shop,-5.00\n2023-01-03,Pay,100\n")
+
+    df = pd.concat(convert(source, field_mappings))
+
+    assert df["Payee"].tolist() == ["Shop", "Pay"]
+    assert df.index.tolist() == [0, 1]
+
+
+def test_convert_date_format(tmp_path, field_mappings):
+    """Test that a date format given in the mapping is used instead of inferring one"""
+    file_path = tmp_path / "day-first.csv"
+    file_path.write_text("Date,Description,Amount\n01/02/2024,Shop,-5.00\n05/02/2024,Pay,100\n")
+
+    # Without a format the dates fit both orders, so month-first is assumed
+    df = pd.concat(convert(file_path, field_mappings))
+    assert df["Date"].tolist() == ["2024-01-02", "2024-05-02"]
+
+    field_mappings[0].date_format = "%d/%m/%Y"
+    df = pd.concat(convert(file_path, field_mappings))
+
+    assert df["Payee"].tolist() == ["Shop", "Pay"]
+    assert df["Date"].tolist() == ["2024-02-01", "2024-02-05"]
+
+
+@pytest.mark.parametrize(
+    ("csv_file", "mapping_file"),
+    [
+        ("CapitalOne-Transactions.csv", "capitalone-mappings.yaml"),
+        ("DiscoverCard-Statement.csv", "discovercard-mapping.yaml"),
+    ],
+)
+@pytest.mark.parametrize("date_format", [True, False])
+def test_convert_sample_files(csv_file, mapping_file, date_format):
+    """Test that the shipped samples convert in full, with or without the mapping's date format"""
+    field_mappings = load_mapping(RESOURCES_DIR / mapping_file)
+    if not date_format:
+        for field_mapping in field_mappings:
+            field_mapping.date_format = ""
+    summary = ValidationSummary()
+
+    df = pd.concat(convert(RESOURCES_DIR / csv_file, field_mappings, summary=summary))
+
+    assert summary.invalid_rows == 0
+    assert len(df) == len(pd.read_csv(RESOURCES_DIR / csv_file))
+    assert df["Date"].str.match(r"^2024-1[01]-\d\d$").all()
+
+
+def test_convert_date_format_fixed_per_file(tmp_path, field_mappings):
+    """Test that the date format inferred from the first chunk is used for every later chunk"""
+    file_path = tmp_path / "day-first.csv"
+    file_path.write_text("Date,Description,Amount\n20/01/2024,A,1\n05/01/2024,B,2\n06/01/2024,C,3\n07/02/2024,D,4\n")
+
+    df = pd.concat(convert(file_path, field_mappings, chunksize=2, since=date(2024, 1, 5), until=date(2024, 1, 31)))
+
+    assert df["Payee"].tolist() == ["A", "B", "C"]
+    assert df["Date"].tolist() == ["2024-01-20", "2024-01-05", "2024-01-06"]
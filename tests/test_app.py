@@ -4,11 +4,9 @@ import pandas as pd
 from typer.testing import CliRunner
 from loguru import logger
 from ynab_format_csv.app import (
-    generate_ynab_header_fields,
     print_sample_rows,
     choose_field,
     map_csv_header_fields,
-    filter_dataframe,
     prompt_to_save_mapping,
     version_callback,
     app,
@@ -38,18 +36,6 @@ def field_mappings():
     ]
 
 
-def test_generate_ynab_header_fields():
-    """Test generation of YNAB header fields"""
-    fields = generate_ynab_header_fields()
-    assert len(fields) == 6
-    assert fields[0].ynab_field == "Date"
-    assert fields[1].ynab_field == "Payee"
-    assert fields[2].ynab_field == "Memo"
-    assert fields[3].ynab_field == "Amount"
-    assert fields[4].ynab_field == "Outflow"
-    assert fields[5].ynab_field == "Inflow"
-
-
 def test_print_sample_rows(capsys, sample_df):
     """Test printing sample rows from DataFrame"""
     print_sample_rows(sample_df, num_rows=2)
@@ -59,20 +45,6 @@ def test_print_sample_rows(capsys, sample_df):
     assert "Test Deposit" in captured.out
 
 
-def test_filter_dataframe(sample_df, field_mappings):
-    """Test filtering and renaming DataFrame columns"""
-    filtered_df = filter_dataframe(sample_df, field_mappings)
-    assert list(filtered_df.columns) == ["Date", "Payee", "Amount"]
-    assert len(filtered_df) == 2
-
-
-def test_filter_dataframe_invalid_mapping(sample_df):
-    """Test filtering with invalid mapping"""
-    invalid_mappings = [FieldMapping(ynab_field="Date", csv_field="NonexistentField")]
-    with pytest.raises(SystemExit):
-        filter_dataframe(sample_df, invalid_mappings)
-
-
 def test_app_main():
     """Test main CLI application"""
     runner = CliRunner()
@@ -112,3 +84,179 @@ def test_prompt_to_save_mapping(monkeypatch, tmp_path, field_mappings):
 
     prompt_to_save_mapping(field_mappings)
     assert (tmp_path / "mapping.yaml").exists()
+
+
+def test_app_main_with_mapping(tmp_path, sample_csv_file, sample_mapping_file, field_mappings):
+    """Test the CLI converting a file with a saved mapping"""
+    from ynab_format_csv.fileio import write_field_mappings_to_yaml
+
+    write_field_mappings_to_yaml(field_mappings, sample_mapping_file)
+    runner = CliRunner()
+
+    result = runner.invoke(app, [str(sample_csv_file), "-c", str(sample_mapping_file), "-o", str(tmp_path)])
+
+    assert result.exit_code == 0
+    assert "Updated data written to" in result.output
+    assert len(pd.read_csv(tmp_path / "transactions.ynab.csv")) == 2
+
+
+def test_app_main_mapping_mismatch(tmp_path, sample_csv_file, sample_mapping_file):
+    """Test the CLI reporting a mapping that doesn't match the file"""
+    from ynab_format_csv.fileio import write_field_mappings_to_yaml
+
+    write_field_mappings_to_yaml([FieldMapping(ynab_field="Date", csv_field="Nonexistent")], sample_mapping_file)
+    runner = CliRunner()
+
+    result = runner.invoke(app, [str(sample_csv_file), "-c", str(sample_mapping_file), "-o", str(tmp_path)])
+
+    assert result.exit_code == 1
+    assert "Nonexistent" in result.output
+
+
+def test_app_query(tmp_path, sample_csv_file, sample_mapping_file, field_mappings):
+    """Test converting into a history store, then querying it"""
+    pytest.importorskip("pyarrow")
+    from ynab_format_csv.fileio import write_field_mappings_to_yaml
+
+    write_field_mappings_to_yaml(field_mappings, sample_mapping_file)
+    history_dir = tmp_path / "history"
+    runner = CliRunner()
+
+    result = runner.invoke(
+        app,
+        [str(sample_csv_file), "-c", str(sample_mapping_file), "-o", str(tmp_path), "--history", str(history_dir)],
+    )
+    assert result.exit_code == 0
+
+    result = runner.invoke(app, ["query", str(history_dir), "--payee", "payment", "--column", "amount"])
+    assert result.exit_code == 0
+    assert "1 transaction(s), totalling -50.00" in result.output
+
+
+def test_app_transfers(tmp_path, sample_csv_file, sample_mapping_file, field_mappings):
+    """Test converting two accounts and marking the transfer between them"""
+    from ynab_format_csv.fileio import write_field_mappings_to_yaml
+
+    write_field_mappings_to_yaml(field_mappings, sample_mapping_file)
+    savings_file = tmp_path / "savings.csv"
+    savings_file.write_text("Date,Description,Amount\n2023-01-02,From checking,50.00\n")
+    runner = CliRunner()
+
+    result = runner.invoke(
+        app,
+        [
+            "transfers",
+            str(sample_csv_file),
+            str(savings_file),
+            "-c",
+            str(sample_mapping_file),
+            "--name",
+            "Checking",
+            "--name",
+            "Savings",
+            "-o",
+            str(tmp_path),
+        ],
+    )
+
+    assert result.exit_code == 0
+    assert pd.read_csv(tmp_path / "transactions.ynab.csv")["Payee"].tolist() == ["Transfer : Savings", "Test Deposit"]
+    assert pd.read_csv(tmp_path / "savings.ynab.csv")["Payee"].tolist() == ["Transfer : Checking"]
+
+
+def test_app_main_merges_files(tmp_path, sample_csv_file, sample_mapping_file, field_mappings):
+    """Test the CLI merging two files into one date-ordered output"""
+    from ynab_format_csv.fileio import write_field_mappings_to_yaml
+
+    write_field_mappings_to_yaml(field_mappings, sample_mapping_file)
+    earlier_file = tmp_path / "december.csv"
+    earlier_file.write_text("Date,Description,Amount\n2022-12-31,Earlier,-1.00\n2023-01-01,Same day,-2.00\n")
+    runner = CliRunner()
+
+    result = runner.invoke(
+        app, [str(sample_csv_file), str(earlier_file), "-c", str(sample_mapping_file), "-o", str(tmp_path)]
+    )
+
+    assert result.exit_code == 0
+    output = pd.read_csv(tmp_path / "transactions.merged.ynab.csv")
+    assert output["Payee"].tolist() == ["Earlier", "Test Payment", "Same day", "Test Deposit"]
+
+
+def test_app_main_missing_file(tmp_path, sample_csv_file, sample_mapping_file, field_mappings):
+    """Test that a missing input file after the first is reported without a traceback"""
+    from ynab_format_csv.fileio import write_field_mappings_to_yaml
+
+    write_field_mappings_to_yaml(field_mappings, sample_mapping_file)
+    runner = CliRunner()
+
+    files = [str(sample_csv_file), str(tmp_path / "missing.csv")]
+
+    for command in ([], ["transfers"]):
+        result = runner.invoke(app, [*command, *files, "-c", str(sample_mapping_file), "-o", str(tmp_path)])
+
+        assert result.exit_code == 2
+        assert isinstance(result.exception, SystemExit)
+
+
+def test_app_main_split_mapping(tmp_path, sample_mapping_file, field_mappings):
+    """Test the CLI mapping one split value with its own mapping file"""
+    from ynab_format_csv.fileio import write_field_mappings_to_yaml
+
+    write_field_mappings_to_yaml(field_mappings, sample_mapping_file)
+    card_mapping_file = tmp_path / "card.yaml"
+    write_field_mappings_to_yaml(
+        [
+            FieldMapping(ynab_field="Date", csv_field="Date"),
+            FieldMapping(ynab_field="Payee", csv_field="Description"),
+            FieldMapping(ynab_field="Outflow", csv_field="Debit"),
+        ],
+        card_mapping_file,
+    )
+    csv_file = tmp_path / "joint.csv"
+    csv_file.write_text("Account,Date,Description,Amount,Debit\n0238,2023-01-01,Shop,-5.00,\n0500,2023-01-02,Rent,,x\n")
+    args = [str(csv_file), "-c", str(sample_mapping_file), "-o", str(tmp_path), "--split-mapping", f"0500={card_mapping_file}"]
+    runner = CliRunner()
+
+    result = runner.invoke(app, args)
+    assert result.exit_code == 2
+
+    result = runner.invoke(app, [*args, "--split-by", "Account"])
+
+    assert result.exit_code == 0
+    assert pd.read_csv(tmp_path / "joint.0238.ynab.csv").columns.tolist() == ["Date", "Payee", "Amount"]
+    assert pd.read_csv(tmp_path / "joint.0500.quarantine.csv").columns.tolist() == [
+        "Line",
+        "Reason",
+        "Date",
+        "Payee",
+        "Outflow",
+    ]
+
+
+def test_app_main_fx_rates_requires_base_currency(tmp_path, monkeypatch, sample_mapping_file):
+    """Test that --fx-rates is rejected without --base-currency, and rows in it left unconverted"""
+    from ynab_format_csv.fileio import write_field_mappings_to_yaml
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    write_field_mappings_to_yaml(
+        [
+            FieldMapping(ynab_field="Date", csv_field="Date"),
+            FieldMapping(ynab_field="Amount", csv_field="Amount"),
+            FieldMapping(ynab_field="Currency", csv_field="Currency"),
+        ],
+        sample_mapping_file,
+    )
+    csv_file = tmp_path / "card.csv"
+    csv_file.write_text("Date,Amount,Currency\n2023-01-02,-10.00,USD\n2023-01-02,-10.00,EUR\n")
+    rate_file = tmp_path / "rates.csv"
+    rate_file.write_text("Date,Currency,Rate\n2023-01-01,EUR,1.1\n")
+    args = [str(csv_file), "-c", str(sample_mapping_file), "-o", str(tmp_path), "--fx-rates", str(rate_file)]
+    runner = CliRunner()
+
+    result = runner.invoke(app, args)
+    assert result.exit_code == 2
+
+    result = runner.invoke(app, [*args, "--base-currency", "USD"])
+
+    assert result.exit_code == 0
+    assert pd.read_csv(tmp_path / "card.ynab.csv")["Amount"].tolist() == [-10.0, -11.0]
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+from loguru import logger
+
+from ynab_format_csv.collapse import collapse_pending_transactions, normalize_payee
+
+
+@pytest.fixture
+def pending_df():
+    """Create transactions with one pending/posted pair"""
+    return pd.DataFrame(
+        {
+            "Date": ["2024-10-01", "2024-10-01", "2024-10-03", "2024-10-20"],
+            "Payee": ["COFFEE SHOP #12", "Grocery Store", "Coffee Shop 12", "Coffee Shop 12"],
+            "Amount": [-5.00, -50.00, -5.00, -5.00],
+        }
+    )
+
+
+def test_normalize_payee():
+    """Test that formatting differences in payee names are ignored"""
+    assert normalize_payee(pd.Series(["Coffee  Shop #12", "COFFEE SHOP 12 "])).tolist() == ["COFFEE SHOP 12"] * 2
+
+
+def test_collapse_pending_transactions(pending_df):
+    """Test that the earlier row of a pair is dropped and later rows outside the tolerance are kept"""
+    result = collapse_pending_transactions(pending_df, tolerance_days=3)
+
+    assert result.index.tolist() == [1, 2, 3]
+    assert result["Date"].tolist() == ["2024-10-01", "2024-10-03", "2024-10-20"]
+
+
+def test_collapse_pending_transactions_outside_tolerance(pending_df):
+    """Test that no rows are dropped when the dates are too far apart"""
+    result = collapse_pending_transactions(pending_df, tolerance_days=1)
+    assert len(result) == 4
+
+
+def test_collapse_pending_transactions_pairs_once():
+    """Test that a run of three matching rows collapses only one pair"""
+    df = pd.DataFrame(
+        {
+            "Date": ["2024-10-01", "2024-10-02", "2024-10-03"],
+            "Payee": ["Toll"] * 3,
+            "Outflow": [2.50] * 3,
+            "Inflow": [None] * 3,
+        }
+    )
+    result = collapse_pending_transactions(df, tolerance_days=5)
+    assert result.index.tolist() == [1, 2]
+
+
+def test_collapse_pending_transactions_logged(pending_df):
+    """Test that each collapse is logged with its line numbers"""
+    messages = []
+    logger.enable("ynab_format_csv")
+    handler_id = logger.add(messages.append, level="INFO")
+    try:
+        collapse_pending_transactions(pending_df, tolerance_days=3)
+    finally:
+        logger.remove(handler_id)
+        logger.disable("ynab_format_csv")
+
+    assert len(messages) == 1
+    assert "line 2" in messages[0]
+    assert "line 4" in messages[0]
@@ -0,0 +1,84 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from ynab_format_csv.api import convert
+from ynab_format_csv.dataclasses import FieldMapping
+
+
+@pytest.fixture
+def field_mappings():
+    """Create field mappings for the dated CSV files"""
+    return [
+        FieldMapping(ynab_field="Date", csv_field="Date"),
+        FieldMapping(ynab_field="Payee", csv_field="Description"),
+        FieldMapping(ynab_field="Amount", csv_field="Amount"),
+    ]
+
+
+def convert_dates(tmp_path, field_mappings, dates, chunksize=2, **kwargs):
+    """Convert a file with the given dates, returning the payees kept, the quarantined rows and the rows read"""
+    file_path = tmp_path / "dated.csv"
+    rows = "".join(f"{day},Row {number},1.00\n" for number, day in enumerate(dates))
+    file_path.write_text(f"Date,Description,Amount\n{rows}")
+    quarantined = []
+    progress = []
+
+    batches = list(
+        convert(
+            file_path,
+            field_mappings,
+            chunksize=chunksize,
+            on_invalid=quarantined.append,
+            on_progress=lambda bytes_read, rows: progress.append(rows),
+            **kwargs,
+        )
+    )
+    payees = pd.concat(batches)["Payee"].tolist() if batches else []
+    invalid = pd.concat(quarantined)["Payee"].tolist() if quarantined else []
+
+    return payees, invalid, progress[-1]
+
+
+def test_date_range_keeps_range_and_unparseable_dates(tmp_path, field_mappings):
+    """Test that rows outside the range are dropped, and unparseable dates kept for validation"""
+    dates = ["2024-02-10", "2024-01-05", "garbage", "2024-03-01"]
+
+    payees, invalid, rows_read = convert_dates(
+        tmp_path, field_mappings, dates, chunksize=10, since=date(2024, 2, 1), until=date(2024, 2, 29)
+    )
+
+    assert payees == ["Row 0"]
+    assert invalid == ["Row 2"]
+    assert rows_read == 4
+
+
+def test_date_range_stops_ascending(tmp_path, field_mappings):
+    """Test that reading stops once an ascending file has passed the end of the range"""
+    dates = ["2024-01-01", "2024-01-15", "2024-01-30", "2024-02-02", "2024-02-03", "2024-02-04"]
+
+    payees, _, rows_read = convert_dates(tmp_path, field_mappings, dates, until=date(2024, 1, 31))
+
+    assert payees == ["Row 0", "Row 1", "Row 2"]
+    assert rows_read == 4
+
+
+def test_date_range_stops_descending(tmp_path, field_mappings):
+    """Test that reading stops once a newest-first file has passed the start of the range"""
+    dates = ["2024-01-31", "2024-01-10", "2024-01-05", "2024-01-01"]
+
+    payees, _, rows_read = convert_dates(tmp_path, field_mappings, dates, since=date(2024, 1, 15))
+
+    assert payees == ["Row 0"]
+    assert rows_read == 2
+
+
+def test_date_range_unsorted_does_not_stop(tmp_path, field_mappings):
+    """Test that an unsorted file is read to the end"""
+    dates = ["2024-03-01", "2024-01-01", "2024-04-01", "2024-01-02", "2024-01-03"]
+
+    payees, _, rows_read = convert_dates(tmp_path, field_mappings, dates, until=date(2024, 1, 31))
+
+    assert payees == ["Row 1", "Row 3", "Row 4"]
+    assert rows_read == 5
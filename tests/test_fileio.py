@@ -5,11 +5,16 @@ from pathlib import Path
 from unittest.mock import mock_open, patch, MagicMock
 
 from ynab_format_csv.dataclasses import FieldMapping
+from ynab_format_csv.exceptions import MappingFileError, TransactionFileError
 from ynab_format_csv.fileio import (
     write_field_mappings_to_yaml,
     read_field_mappings_from_yaml,
     read_csv_transaction_file,
     write_dataframe_to_csv_file,
+    CsvBatchWriter,
+    SplitCsvWriter,
+    iter_csv_transaction_file,
+    output_file_path,
 )
 
 
@@ -74,12 +79,10 @@ def test_write_field_mappings_to_yaml_success(sample_field_mappings, tmp_path):
 
 def test_write_field_mappings_to_yaml_permission_error(sample_field_mappings):
     """Test handling of permission error when writing YAML file"""
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(MappingFileError):
         with patch("pathlib.Path.open", side_effect=PermissionError):
             write_field_mappings_to_yaml(sample_field_mappings, Path("/invalid/path"))
 
-    assert exc_info.value.code == 1
-
 
 # Test read_field_mappings_from_yaml
 def test_read_field_mappings_from_yaml_success(sample_yaml_content, tmp_path):
@@ -102,8 +105,8 @@ def test_read_field_mappings_from_yaml_invalid_yaml(tmp_path):
     with open(input_file, "w") as f:
         f.write("invalid: yaml: content:")
 
-    result = read_field_mappings_from_yaml(input_file)
-    assert result == []
+    with pytest.raises(MappingFileError):
+        read_field_mappings_from_yaml(input_file)
 
 
 def test_read_field_mappings_from_yaml_corrupt_mapping(tmp_path):
@@ -112,8 +115,8 @@ def test_read_field_mappings_from_yaml_corrupt_mapping(tmp_path):
     with open(input_file, "w") as f:
         f.write("- invalid_field: value")
 
-    result = read_field_mappings_from_yaml(input_file)
-    assert result == []
+    with pytest.raises(MappingFileError):
+        read_field_mappings_from_yaml(input_file)
 
 
 # Test read_csv_transaction_file
@@ -132,10 +135,24 @@ def test_read_csv_transaction_file_success(sample_csv_content, tmp_path):
 
 def test_read_csv_transaction_file_not_found():
     """Test handling of non-existent CSV file"""
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(TransactionFileError):
         read_csv_transaction_file(Path("nonexistent.csv"))
 
-    assert exc_info.value.code == 1
+
+@pytest.mark.parametrize(
+    "content",
+    [b"Date,Payee\n01/01/2024,Caf\xe9\n", b"", b'Date,Payee\n01/01/2024,"unclosed\n'],
+    ids=["not-utf8", "empty", "malformed"],
+)
+def test_read_csv_transaction_file_invalid(content, tmp_path):
+    """Test that undecodable, empty and malformed files raise TransactionFileError"""
+    input_file = tmp_path / "transactions.csv"
+    input_file.write_bytes(content)
+
+    with pytest.raises(TransactionFileError):
+        read_csv_transaction_file(input_file)
+    with pytest.raises(TransactionFileError):
+        list(iter_csv_transaction_file(input_file))
 
 
 # Test write_dataframe_to_csv_file
@@ -193,3 +210,113 @@ def test_full_csv_workflow(sample_dataframe, tmp_path):
 
     # Verify
     pd.testing.assert_frame_equal(read_df, sample_dataframe)
+
+
+
+def test_iter_csv_transaction_file_chunks(sample_csv_content, tmp_path):
+    """Test streaming a CSV file in chunks, keeping the values as strings"""
+    input_file = tmp_path / "transactions.csv"
+    input_file.write_text(sample_csv_content)
+
+    chunks = list(iter_csv_transaction_file(input_file, chunksize=1))
+
+    assert len(chunks) == 2
+    assert chunks[1].index.tolist() == [1]
+    assert chunks[0]["Amount"].iloc[0] == "-50.00"
+
+
+def test_iter_csv_transaction_file_line_offsets(tmp_path):
+    """Test that the index counts blank lines and quoted fields spanning several lines, across chunks"""
+    input_file = tmp_path / "transactions.csv"
+    input_file.write_text('Date,Description,Amount\n\n2024-01-01,"Two\nlines",1\n,,\n2024-01-02,Shop,2\n')
+
+    chunks = list(iter_csv_transaction_file(input_file, chunksize=2))
+
+    assert [chunk.index.tolist() for chunk in chunks] == [[1], [4]]
+    assert chunks[0]["Description"].iloc[0] == "Two\nlines"
+
+
+def test_iter_csv_transaction_file_not_found():
+    """Test handling of non-existent CSV file when streaming"""
+    with pytest.raises(TransactionFileError):
+        list(iter_csv_transaction_file(Path("nonexistent.csv")))
+
+
+def test_output_file_path(tmp_path):
+    """Test building an output path from the input file name"""
+    assert output_file_path(tmp_path, Path("in/bank.csv"), ".ynab.csv") == tmp_path / "bank.ynab.csv"
+
+
+def test_csv_batch_writer(sample_dataframe, tmp_path):
+    """Test appending batches to a CSV file with a single header"""
+    output_file = tmp_path / "batches.csv"
+
+    with CsvBatchWriter(output_file) as writer:
+        writer.write(sample_dataframe)
+        writer.write(sample_dataframe)
+
+    assert writer.rows == 4
+    assert len(pd.read_csv(output_file)) == 4
+
+
+def test_csv_batch_writer_no_batches(tmp_path):
+    """Test that no file is created when nothing is written"""
+    output_file = tmp_path / "empty.csv"
+
+    with CsvBatchWriter(output_file):
+        pass
+
+    assert not output_file.exists()
+
+
+def test_split_csv_writer(tmp_path):
+    """Test partitioning batches into one file per key, in a single pass"""
+    batch = pd.DataFrame({"Date": ["2023-01-01", "2023-01-02", "2023-01-03"], "Account": ["0238", "0500", "0238"]})
+
+    with SplitCsvWriter(tmp_path, Path("bank.csv"), ".ynab.csv", "Account") as writer:
+        writer.write(batch)
+        writer.write(batch.iloc[:1])
+
+    assert writer.rows == 4
+    assert writer.writers["0238"].rows == 3
+    first = pd.read_csv(tmp_path / "bank.0238.ynab.csv")
+    assert list(first.columns) == ["Date"]
+    assert first["Date"].tolist() == ["2023-01-01", "2023-01-03", "2023-01-01"]
+    assert (tmp_path / "bank.0500.ynab.csv").exists()
+
+
+def test_split_csv_writer_colliding_keys(tmp_path):
+    """Test that keys sanitizing to the same file name get separate files"""
+    batch = pd.DataFrame({"Date": ["2023-01-01", "2023-01-02"], "Account": ["a/b", "a b"]})
+
+    with SplitCsvWriter(tmp_path, Path("bank.csv"), ".ynab.csv", "Account") as writer:
+        writer.write(batch)
+
+    assert writer.writers["a/b"].file_path.name == "bank.a_b.ynab.csv"
+    assert writer.writers["a b"].file_path.name == "bank.a_b-2.ynab.csv"
+
+
+def test_iter_csv_transaction_file_progress(sample_csv_content, tmp_path):
+    """Test reporting the bytes consumed and rows read after each chunk"""
+    input_file = tmp_path / "transactions.csv"
+    input_file.write_text(sample_csv_content)
+    progress = []
+
+    list(iter_csv_transaction_file(input_file, chunksize=1, on_progress=lambda *args: progress.append(args)))
+
+    assert [rows for _, rows in progress] == [1, 2]
+    assert progress[-1][0] == input_file.stat().st_size
+
+
+def test_read_field_mappings_from_yaml_template(tmp_path):
+    """Test reading a mapping with a template field, alongside fields saved before templates existed"""
+    input_file = tmp_path / "mappings.yaml"
+    input_file.write_text(
+        "- ynab_field: Date\n  csv_field: Date\n  note: ''\n"
+        "- ynab_field: Memo\n  csv_field: ''\n  note: ''\n  template: '{Category} / {Transaction Type}'\n"
+    )
+
+    result = read_field_mappings_from_yaml(input_file)
+
+    assert result[0].template == ""
+    assert result[1].template == "{Category} / {Transaction Type}"
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ynab_format_csv.exceptions import RateTableError
+from ynab_format_csv.fx import RATE_SCALE, CurrencyConverter, convert_cents, read_rate_table, scale_rate
+from ynab_format_csv.validation import MISSING_FX_RATE, validate_dataframe
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Keep the on-disk rate table cache inside the test's temporary directory"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def rate_file(tmp_path):
+    """Create a rate table with EUR and JPY rates"""
+    file_path = tmp_path / "rates.csv"
+    file_path.write_text(
+        "Date,Currency,Rate\n2024-01-01,EUR,1.10\n2024-01-03,EUR,1.0825\n2024-01-01,JPY,0.0068\n"
+    )
+    return file_path
+
+
+def test_scale_rate_is_exact():
+    """Test that decimal rates are scaled without floating point error"""
+    assert scale_rate("1.0825") == 1_082_500_000
+    with pytest.raises(RateTableError):
+        scale_rate("-1")
+
+
+def test_convert_cents_rounds_half_away_from_zero():
+    """Test integer conversion and rounding to the cent"""
+    cents = np.array([1000, -1000, 5], dtype="int64")
+    rates = np.array([scale_rate("1.0825")] * 2 + [RATE_SCALE // 2], dtype="int64")
+    assert convert_cents(cents, rates).tolist() == [1083, -1083, 3]
+
+
+def test_convert_cents_large_values():
+    """Test that products too large for int64 are still exact"""
+    cents = np.array([10**12], dtype="int64")
+    rates = np.array([scale_rate("150.5")], dtype="int64")
+    assert convert_cents(cents, rates).tolist() == [150_500_000_000_000]
+
+
+def test_read_rate_table_cached(rate_file, tmp_path):
+    """Test that a parsed rate table is written to and reused from the disk cache"""
+    table = read_rate_table(rate_file)
+
+    assert table["date"].is_monotonic_increasing
+    assert len(list((tmp_path / "cache" / "ynab-format-csv").glob("*.npz"))) == 1
+
+
+def test_read_rate_table_damaged_cache(rate_file, tmp_path):
+    """Test that a truncated cache file is treated as a miss and replaced"""
+    from ynab_format_csv.fx import load_cached_rate_table
+
+    table = read_rate_table(rate_file)
+    (cache_file,) = (tmp_path / "cache" / "ynab-format-csv").glob("*.npz")
+    cache_file.write_bytes(cache_file.read_bytes()[:50])
+    load_cached_rate_table.cache_clear()
+
+    assert read_rate_table(rate_file).equals(table)
+    assert cache_file.stat().st_size > 50
+
+
+def test_read_rate_table_replaces_stale_cache(rate_file, tmp_path):
+    """Test that the cache of an edited rate table replaces the old one"""
+    read_rate_table(rate_file)
+    rate_file.write_text("Date,Currency,Rate\n2024-01-01,EUR,1.10\n")
+    os.utime(rate_file, ns=(0, 0))
+
+    assert len(read_rate_table(rate_file)) == 1
+    assert len(list((tmp_path / "cache" / "ynab-format-csv").iterdir())) == 1
+
+
+def test_read_rate_table_missing_column(tmp_path):
+    """Test a rate table without a Rate column"""
+    file_path = tmp_path / "bad.csv"
+    file_path.write_text("Date,Currency\n2024-01-01,EUR\n")
+    with pytest.raises(RateTableError):
+        read_rate_table(file_path)
+
+
+def test_currency_converter_as_of_join(rate_file):
+    """Test conversion with the latest rate on or before each date, and quarantine of missing rates"""
+    df = pd.DataFrame(
+        {
+            "Date": ["2024-01-02", "2024-01-04", "2024-01-02", "2023-12-31", "2024-01-02"],
+            "Payee": ["Cafe", "Hotel", "Train", "Early", "Local"],
+            "Amount": [-10.00, -200.00, -1000, -5.00, -3.00],
+            "Currency": ["EUR", "eur", "JPY", "EUR", "USD"],
+        }
+    )
+    converter = CurrencyConverter.from_file(rate_file, base_currency="USD")
+
+    result = converter.apply(validate_dataframe(df))
+
+    assert list(result.valid.columns) == ["Date", "Payee", "Amount"]
+    assert result.valid["Amount"].tolist() == [-11.00, -216.50, -6.80, -3.00]
+    assert result.invalid["Payee"].tolist() == ["Early"]
+    assert result.reasons == {MISSING_FX_RATE: 1}
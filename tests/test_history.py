@@ -0,0 +1,89 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from ynab_format_csv.exceptions import HistoryStoreError
+from ynab_format_csv.history import STAGING_DIR, HistoryWriter, query_history, source_digest
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def batch():
+    """Create a batch of validated YNAB rows spanning two months"""
+    return pd.DataFrame(
+        {
+            "Date": ["10/30/2024", "11/02/2024", "11/15/2024"],
+            "Payee": ["Vendor X", "Coffee Shop", "VENDOR X LLC"],
+            "Outflow": [100.00, 5.00, 250.00],
+            "Inflow": [None, None, None],
+        }
+    )
+
+
+def save_to_history(batch, store_dir, source="bank.csv", digest="digest"):
+    """Save a batch to the history store as a single conversion"""
+    with HistoryWriter(store_dir, source, digest) as history:
+        history.write(batch)
+    return history
+
+
+def test_history_writer_partitions_by_month(batch, tmp_path):
+    """Test that rows are written to month partitions"""
+    assert save_to_history(batch, tmp_path).rows == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["month=2024-10", "month=2024-11"]
+
+
+def test_history_writer_replaces_same_source(batch, tmp_path):
+    """Test that converting the same source again replaces its rows, and other sources add rows"""
+    save_to_history(batch, tmp_path)
+    save_to_history(batch, tmp_path)
+    assert len(query_history(tmp_path)) == 3
+
+    save_to_history(batch.iloc[:1], tmp_path, digest="other")
+    assert len(query_history(tmp_path)) == 4
+
+
+def test_history_writer_discards_failed_conversion(batch, tmp_path):
+    """Test that nothing is stored when the conversion fails part way"""
+    with pytest.raises(RuntimeError):
+        with HistoryWriter(tmp_path, "bank.csv", "digest") as history:
+            history.write(batch)
+            raise RuntimeError("conversion failed")
+
+    assert not any(tmp_path.glob("month=*"))
+    assert not (tmp_path / STAGING_DIR).exists()
+
+
+def test_source_digest(tmp_path):
+    """Test that the digest depends on the files' content"""
+    first, second = tmp_path / "a.csv", tmp_path / "b.csv"
+    first.write_text("Date\n2024-01-01\n")
+    second.write_text("Date\n2024-01-02\n")
+
+    assert source_digest([first]) == source_digest([first])
+    assert source_digest([first]) != source_digest([second])
+
+
+def test_query_history_filters(batch, tmp_path):
+    """Test filtering by payee and date range, and selecting columns"""
+    save_to_history(batch, tmp_path)
+
+    result = query_history(tmp_path, payee="vendor x", since=date(2024, 11, 1), columns=["date", "amount"])
+
+    assert list(result.columns) == ["date", "amount"]
+    assert result["amount"].tolist() == [-250.00]
+
+
+def test_query_history_missing_store(tmp_path):
+    """Test querying a store that doesn't exist"""
+    with pytest.raises(HistoryStoreError):
+        query_history(tmp_path / "missing")
+
+
+def test_query_history_unknown_column(batch, tmp_path):
+    """Test requesting a column the store doesn't have"""
+    save_to_history(batch, tmp_path)
+    with pytest.raises(HistoryStoreError):
+        query_history(tmp_path, columns=["nonexistent"])
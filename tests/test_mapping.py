@@ -0,0 +1,122 @@
+import pandas as pd
+import pytest
+
+from ynab_format_csv.dataclasses import FieldMapping
+from ynab_format_csv.exceptions import MappingError
+from ynab_format_csv.mapping import filter_dataframe, generate_ynab_header_fields, render_template
+
+
+@pytest.fixture
+def sample_df():
+    """Create a sample DataFrame for testing"""
+    return pd.DataFrame(
+        {
+            "Date": ["2023-01-01", "2023-01-02"],
+            "Description": ["Test Payment", "Test Deposit"],
+            "Amount": [-50.00, 100.00],
+        }
+    )
+
+
+@pytest.fixture
+def field_mappings():
+    """Create sample field mappings"""
+    return [
+        FieldMapping(ynab_field="Date", csv_field="Date"),
+        FieldMapping(ynab_field="Payee", csv_field="Description"),
+        FieldMapping(ynab_field="Amount", csv_field="Amount"),
+    ]
+
+
+def test_generate_ynab_header_fields():
+    """Test generation of YNAB header fields"""
+    fields = generate_ynab_header_fields()
+    assert len(fields) == 6
+    assert fields[0].ynab_field == "Date"
+    assert fields[1].ynab_field == "Payee"
+    assert fields[2].ynab_field == "Memo"
+    assert fields[3].ynab_field == "Amount"
+    assert fields[4].ynab_field == "Outflow"
+    assert fields[5].ynab_field == "Inflow"
+
+
+def test_filter_dataframe(sample_df, field_mappings):
+    """Test filtering and renaming DataFrame columns"""
+    filtered_df = filter_dataframe(sample_df, field_mappings)
+    assert list(filtered_df.columns) == ["Date", "Payee", "Amount"]
+    assert len(filtered_df) == 2
+
+
+def test_filter_dataframe_invalid_mapping(sample_df):
+    """Test filtering with invalid mapping"""
+    invalid_mappings = [FieldMapping(ynab_field="Date", csv_field="NonexistentField")]
+    with pytest.raises(MappingError):
+        filter_dataframe(sample_df, invalid_mappings)
+
+
+def test_filter_dataframe_skipped_fields(sample_df, field_mappings):
+    """Test that skipped fields are left out of the filtered DataFrame"""
+    field_mappings.append(FieldMapping(ynab_field="Memo", csv_field="Skipped"))
+    filtered_df = filter_dataframe(sample_df, field_mappings)
+    assert "Memo" not in filtered_df.columns
+
+
+def test_filter_dataframe_unmapped_column_with_ynab_name():
+    """Test that an unmapped column named like a YNAB field does not collide with the mapped one"""
+    df = pd.DataFrame({"Date": ["2023-01-01"], "Post Date": ["2023-01-03"], "Amount": [1.0]})
+    mappings = [FieldMapping(ynab_field="Date", csv_field="Post Date"), FieldMapping(ynab_field="Amount", csv_field="Amount")]
+    filtered_df = filter_dataframe(df, mappings)
+    assert list(filtered_df.columns) == ["Date", "Amount"]
+    assert filtered_df["Date"].iloc[0] == "2023-01-03"
+
+
+def test_filter_dataframe_template():
+    """Test building a field from several CSV fields with a template"""
+    df = pd.DataFrame(
+        {
+            "Trans. Date": ["10/01/2024", "10/02/2024"],
+            "Category": ["Groceries", None],
+            "Transaction Type": ["Debit", "Credit"],
+        }
+    )
+    mappings = [
+        FieldMapping(ynab_field="Date", csv_field="Trans. Date"),
+        FieldMapping(ynab_field="Memo", template="{Category} / {Transaction Type}"),
+    ]
+
+    filtered_df = filter_dataframe(df, mappings)
+
+    assert list(filtered_df.columns) == ["Date", "Memo"]
+    assert filtered_df["Memo"].tolist() == ["Groceries / Debit", "Credit"]
+
+
+def test_filter_dataframe_template_missing_field(sample_df):
+    """Test a template naming a field that isn't in the file"""
+    mappings = [FieldMapping(ynab_field="Memo", template="{Description} ({Category})")]
+    with pytest.raises(MappingError, match="Category"):
+        filter_dataframe(sample_df, mappings)
+
+
+def test_filter_dataframe_template_format_spec(sample_df):
+    """Test that templates with format specs are rejected"""
+    mappings = [FieldMapping(ynab_field="Memo", template="{Amount:.2f}")]
+    with pytest.raises(MappingError):
+        filter_dataframe(sample_df, mappings)
+
+
+def test_render_template_blank_values():
+    """Test that blank values are left out along with the text joining them to the rest"""
+    df = pd.DataFrame(
+        {
+            "A": ["a", "", "a", None, "", "a"],
+            "B": ["b", "b", "", "b", "", ""],
+            "C": ["c", "c", "c", "", "", "c"],
+        }
+    )
+
+    assert render_template(df, "{A} / {B} - {C}").tolist() == ["a / b - c", "b - c", "a - c", "b", "", "a - c"]
+
+
+def test_render_template_literal_braces(sample_df):
+    """Test escaped braces in a template"""
+    assert render_template(sample_df, "{{{Description}}}").tolist() == ["{Test Payment}", "{Test Deposit}"]
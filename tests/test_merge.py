@@ -0,0 +1,38 @@
+import pandas as pd
+
+from ynab_format_csv.merge import SORT_KEY_COLUMN, merge_by_date, merge_runs
+
+
+def test_merge_runs_is_stable():
+    """Test that equal keys across slices and runs come out in run order"""
+    first = iter(
+        [
+            pd.DataFrame({SORT_KEY_COLUMN: [1, 2], "Row": ["a1", "a2"]}),
+            pd.DataFrame({SORT_KEY_COLUMN: [2, 5], "Row": ["a3", "a4"]}),
+        ]
+    )
+    second = iter([pd.DataFrame({SORT_KEY_COLUMN: [2, 2, 3], "Row": ["b1", "b2", "b3"]})])
+
+    merged = pd.concat(merge_runs([first, second]))
+
+    assert merged["Row"].tolist() == ["a1", "a2", "a3", "b1", "b2", "b3", "a4"]
+
+
+def test_merge_by_date():
+    """Test merging batches in different date formats into date-ordered batches"""
+    batches = [
+        pd.DataFrame({"Date": ["01/03/2024", "12/31/2023"], "Payee": ["C", "A"], "Amount": [-1.25, None]}),
+        pd.DataFrame({"Date": ["2024-01-02", "2024-01-04"], "Payee": ["B", None], "Amount": [3.0, 4.0]}),
+    ]
+
+    merged = list(merge_by_date(iter(batches), chunksize=2))
+
+    df = pd.concat(merged)
+    assert df["Payee"].fillna("").tolist() == ["A", "B", "C", ""]
+    assert df["Amount"].fillna(0).tolist() == [0.0, 3.0, -1.25, 4.0]
+    assert df.columns.tolist() == ["Date", "Payee", "Amount"]
+
+
+def test_merge_by_date_empty():
+    """Test that merging no batches yields nothing"""
+    assert list(merge_by_date(iter([]), chunksize=10)) == []
@@ -0,0 +1,30 @@
+from io import StringIO
+
+from rich.console import Console
+
+from ynab_format_csv.progress import RowsPerSecondColumn, conversion_progress
+
+
+def test_conversion_progress_disabled_without_terminal():
+    """Test that progress output is switched off when not writing to a terminal"""
+    progress = conversion_progress(Console(file=StringIO(), force_terminal=False))
+    assert progress.disable
+
+
+def test_conversion_progress_enabled_on_terminal():
+    """Test that progress output is shown on a terminal"""
+    progress = conversion_progress(Console(file=StringIO(), force_terminal=True))
+    assert not progress.disable
+
+
+def test_rows_per_second_column():
+    """Test rendering the row throughput of a task"""
+    progress = conversion_progress(Console(file=StringIO(), force_terminal=False))
+    task_id = progress.add_task("transactions.csv", total=100, rows=0, start=False)
+    task = progress.tasks[task_id]
+
+    assert str(RowsPerSecondColumn().render(task)) == "? rows/s"
+
+    progress.update(task_id, completed=100, rows=5000)
+    task.finished_time = 2.0
+    assert str(RowsPerSecondColumn().render(task)) == "2,500 rows/s"
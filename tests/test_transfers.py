@@ -0,0 +1,77 @@
+import pandas as pd
+
+from ynab_format_csv.transfers import find_transfer_pairs, match_transfers, transfer_keys
+
+
+def test_match_transfers():
+    """Test that an outflow and an equal inflow in another account are marked as a transfer"""
+    checking = pd.DataFrame(
+        {"Date": ["2024-01-01", "2024-01-03"], "Payee": ["ONLINE PAYMENT", "Coffee"], "Amount": [-100.00, -4.50]}
+    )
+    card = pd.DataFrame(
+        {"Date": ["2024-01-02", "2024-01-02"], "Payee": ["PAYMENT - THANK YOU", "Coffee"], "Amount": [100.00, 4.50]}
+    )
+
+    result = match_transfers({"Checking": checking, "Card": card}, window_days=3)
+
+    assert result["Checking"]["Payee"].tolist() == ["Transfer : Card", "Transfer : Card"]
+    assert result["Card"]["Payee"].tolist() == ["Transfer : Checking", "Transfer : Checking"]
+    assert checking["Payee"].tolist() == ["ONLINE PAYMENT", "Coffee"]
+
+
+def test_match_transfers_outside_window():
+    """Test that rows further apart than the window are not matched"""
+    checking = pd.DataFrame({"Date": ["2024-01-01"], "Payee": ["PAYMENT"], "Amount": [-100.00]})
+    card = pd.DataFrame({"Date": ["2024-01-10"], "Payee": ["THANK YOU"], "Amount": [100.00]})
+
+    result = match_transfers({"Checking": checking, "Card": card}, window_days=3)
+
+    assert result["Checking"]["Payee"].tolist() == ["PAYMENT"]
+    assert result["Card"]["Payee"].tolist() == ["THANK YOU"]
+
+
+def test_match_transfers_same_account():
+    """Test that a refund within the same account is not treated as a transfer"""
+    checking = pd.DataFrame({"Date": ["2024-01-01", "2024-01-02"], "Payee": ["Shop", "Shop"], "Amount": [-20.0, 20.0]})
+    card = pd.DataFrame({"Date": ["2024-01-02"], "Payee": ["Shop"], "Amount": [20.0]})
+
+    result = match_transfers({"Checking": checking, "Card": card}, window_days=3)
+
+    assert result["Checking"]["Payee"].tolist() == ["Transfer : Card", "Shop"]
+    assert result["Card"]["Payee"].tolist() == ["Transfer : Checking"]
+
+
+def test_match_transfers_one_to_one():
+    """Test that repeated amounts are paired once each, nearest date first"""
+    checking = pd.DataFrame(
+        {"Date": ["2024-01-01", "2024-01-05", "2024-01-05"], "Payee": ["A", "B", "C"], "Amount": [-20.0, -20.0, -20.0]}
+    )
+    savings = pd.DataFrame({"Date": ["2024-01-06", "2024-01-02"], "Payee": ["D", "E"], "Amount": [20.0, 20.0]})
+
+    result = match_transfers({"Checking": checking, "Savings": savings}, window_days=3)
+
+    assert result["Checking"]["Payee"].tolist() == ["Transfer : Savings", "Transfer : Savings", "C"]
+    assert result["Savings"]["Payee"].tolist() == ["Transfer : Checking", "Transfer : Checking"]
+
+
+def test_match_transfers_without_payee():
+    """Test that a Payee column is added when the mapping skipped it"""
+    checking = pd.DataFrame({"Date": ["2024-01-01"], "Amount": [-100.00]})
+    card = pd.DataFrame({"Date": ["2024-01-01"], "Outflow": [None], "Inflow": [100.00]})
+
+    result = match_transfers({"Checking": checking, "Card": card}, window_days=0)
+
+    assert result["Checking"]["Payee"].tolist() == ["Transfer : Card"]
+    assert result["Card"]["Payee"].tolist() == ["Transfer : Checking"]
+
+
+def test_find_transfer_pairs_repeated():
+    """Test that many identical transfers are paired one to one, in file order"""
+    checking = pd.DataFrame({"Date": ["2024-01-01"] * 1000, "Amount": [-50.0] * 1000})
+    card = pd.DataFrame({"Date": ["2024-01-02"] * 998, "Amount": [50.0] * 998})
+
+    pairs = find_transfer_pairs(transfer_keys({"Checking": checking, "Card": card}), window_days=3)
+
+    assert len(pairs) == 998
+    assert pairs["out_label"].tolist() == pairs["in_label"].tolist() == list(range(998))
+    assert set(pairs["out_account"]) == {"Checking"}
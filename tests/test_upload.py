@@ -0,0 +1,191 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from ynab_format_csv.exceptions import UploadError
+from ynab_format_csv.upload import YnabUploader, ynab_transactions
+
+
+class StubYnabHandler(BaseHTTPRequestHandler):
+    """A minimal stand-in for the YNAB bulk transactions endpoint"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append((self.path, self.headers["Authorization"], body))
+            server.connections.add(self.client_address)
+            status = server.statuses.pop(0) if server.statuses else 201
+            transactions = body["transactions"]
+            new_ids = [t["import_id"] for t in transactions if t["import_id"] not in server.import_ids]
+            duplicates = [t["import_id"] for t in transactions if t["import_id"] in server.import_ids]
+            if status == 201:
+                server.import_ids.update(new_ids)
+
+        if status == 201:
+            payload = {"data": {"transaction_ids": new_ids, "duplicate_import_ids": duplicates}}
+        else:
+            payload = {"error": {"id": str(status), "name": "error", "detail": "Try again later"}}
+        response = json.dumps(payload).encode()
+
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Run a stub YNAB API server on a free local port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubYnabHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.connections = set()
+    server.statuses = []
+    server.import_ids = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def transactions_df():
+    """Create validated transactions, including a repeated amount on the same day"""
+    return pd.DataFrame(
+        {
+            "Date": ["2024-01-01", "2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+            "Payee": ["Coffee", "Coffee", "Grocery Store", "x" * 250, None],
+            "Amount": [-4.5, -4.5, -52.25, 10.0, 1000.0],
+        }
+    )
+
+
+def test_ynab_transactions(transactions_df):
+    """Test the conversion to API transactions, with import IDs numbered across batches"""
+    occurrences = {}
+    first = ynab_transactions(transactions_df.iloc[:1], "account-1", occurrences)
+    rest = ynab_transactions(transactions_df.iloc[1:], "account-1", occurrences)
+
+    assert first[0] == {
+        "account_id": "account-1",
+        "date": "2024-01-01",
+        "amount": -4500,
+        "payee_name": "Coffee",
+        "memo": None,
+        "import_id": "YNAB:-4500:2024-01-01:1",
+    }
+    assert rest[0]["import_id"] == "YNAB:-4500:2024-01-01:2"
+    assert len(rest[2]["payee_name"]) == 200
+    assert rest[3]["payee_name"] is None
+
+
+def test_uploader(stub_server, transactions_df):
+    """Test that batches are posted, and that re-sending them creates no duplicates"""
+    with YnabUploader("budget-1", "account-1", "token", base_url=stub_server.base_url, batch_size=2) as uploader:
+        uploader.upload(transactions_df)
+
+    assert uploader.created == 5
+    assert len(stub_server.requests) == 3
+    path, authorization, body = stub_server.requests[0]
+    assert path == "/v1/budgets/budget-1/transactions"
+    assert authorization == "Bearer token"
+    assert len(body["transactions"]) <= 2
+
+    with YnabUploader("budget-1", "account-1", "token", base_url=stub_server.base_url) as uploader:
+        uploader.upload(transactions_df)
+
+    assert uploader.created == 0
+    assert uploader.duplicates == 5
+
+
+def test_uploader_reuses_connections(stub_server, transactions_df):
+    """Test that sequential requests share one keep-alive connection"""
+    with YnabUploader(
+        "budget-1", "account-1", "token", base_url=stub_server.base_url, batch_size=1, max_workers=1
+    ) as uploader:
+        uploader.upload(transactions_df)
+
+    assert len(stub_server.requests) == 5
+    assert len(stub_server.connections) == 1
+
+
+def test_uploader_retries(stub_server, transactions_df):
+    """Test that rate-limited and failed requests are retried"""
+    stub_server.statuses = [429, 503]
+
+    with YnabUploader("budget-1", "account-1", "token", base_url=stub_server.base_url, backoff=0) as uploader:
+        uploader.upload(transactions_df)
+
+    assert uploader.created == 5
+    assert len(stub_server.requests) == 3
+
+
+def test_uploader_error(stub_server, transactions_df):
+    """Test that a rejected request raises UploadError"""
+    stub_server.statuses = [400]
+
+    with pytest.raises(UploadError, match="400"):
+        with YnabUploader("budget-1", "account-1", "token", base_url=stub_server.base_url) as uploader:
+            uploader.upload(transactions_df)
+
+
+def test_uploader_invalid_base_url():
+    """Test that an unusable base URL is rejected"""
+    with pytest.raises(UploadError):
+        YnabUploader("budget-1", "account-1", "token", base_url="ftp://example.com")
+
+
+def test_app_upload(stub_server, tmp_path, sample_csv_file, sample_mapping_file):
+    """Test converting a file and uploading it through the CLI"""
+    from typer.testing import CliRunner
+
+    from ynab_format_csv.app import app
+    from ynab_format_csv.dataclasses import FieldMapping
+    from ynab_format_csv.fileio import write_field_mappings_to_yaml
+
+    write_field_mappings_to_yaml(
+        [
+            FieldMapping(ynab_field="Date", csv_field="Date"),
+            FieldMapping(ynab_field="Payee", csv_field="Description"),
+            FieldMapping(ynab_field="Amount", csv_field="Amount"),
+        ],
+        sample_mapping_file,
+    )
+    args = [str(sample_csv_file), "-c", str(sample_mapping_file), "-o", str(tmp_path), "--ynab-budget", "budget-1"]
+    runner = CliRunner()
+
+    result = runner.invoke(app, args)
+    assert result.exit_code == 2
+
+    result = runner.invoke(
+        app,
+        [*args, "--ynab-account", "account-1", "--ynab-base-url", stub_server.base_url],
+        env={"YNAB_ACCESS_TOKEN": "token"},
+    )
+    assert result.exit_code == 0
+    assert "Uploaded 2 transaction(s) to YNAB (0 already imported)" in result.output
+    assert stub_server.requests[0][1] == "Bearer token"
+
+
+def test_uploader_keeps_original_error(stub_server, transactions_df):
+    """Test that an error raised in the block isn't replaced by an upload error on exit"""
+    stub_server.statuses = [400]
+
+    with pytest.raises(RuntimeError, match="conversion failed"):
+        with YnabUploader("budget-1", "account-1", "token", base_url=stub_server.base_url) as uploader:
+            uploader.upload(transactions_df)
+            raise RuntimeError("conversion failed")
@@ -0,0 +1,116 @@
+import pandas as pd
+import pytest
+
+from ynab_format_csv.validation import (
+    INVALID_AMOUNT,
+    INVALID_DATE,
+    INVALID_OUTFLOW,
+    MISSING_DATE,
+    OUTFLOW_AND_INFLOW,
+    infer_date_format,
+    line_description,
+    parse_amounts,
+    parse_dates,
+    validate_dataframe,
+)
+
+
+@pytest.fixture
+def split_amount_df():
+    """Create a DataFrame using separate Outflow and Inflow fields"""
+    return pd.DataFrame(
+        {
+            "Date": ["2023-01-01", None, "not a date", "2023-01-04", "2023-01-05"],
+            "Payee": ["Grocery Store", "Coffee Shop", "Gas Station", "Salary", "Refund"],
+            "Outflow": ["50.00", "abc", "40.00", "10.00", "0.00"],
+            "Inflow": [None, None, None, "1000.00", "12.50"],
+        }
+    )
+
+
+def test_validate_dataframe_all_valid():
+    """Test that valid rows pass through untouched"""
+    df = pd.DataFrame({"Date": ["2023-01-01", "2023-01-02"], "Payee": ["A", "B"], "Amount": [-50.00, 100.00]})
+    result = validate_dataframe(df)
+
+    assert result.invalid.empty
+    assert not result.reasons
+    pd.testing.assert_frame_equal(result.valid, df)
+
+
+def test_validate_dataframe_quarantines_failures(split_amount_df):
+    """Test that failing rows are quarantined with line numbers and reasons"""
+    result = validate_dataframe(split_amount_df)
+
+    assert list(result.valid["Payee"]) == ["Grocery Store", "Refund"]
+    assert list(result.invalid["Line"]) == [3, 4, 5]
+    assert list(result.invalid["Reason"]) == [
+        f"{MISSING_DATE}; {INVALID_OUTFLOW}",
+        INVALID_DATE,
+        OUTFLOW_AND_INFLOW,
+    ]
+    assert result.reasons == {MISSING_DATE: 1, INVALID_OUTFLOW: 1, INVALID_DATE: 1, OUTFLOW_AND_INFLOW: 1}
+
+
+def test_validate_dataframe_normalizes_amounts(split_amount_df):
+    """Test that amounts in the valid rows are converted to numbers"""
+    result = validate_dataframe(split_amount_df)
+
+    assert list(result.valid["Outflow"]) == [50.00, 0.00]
+    assert result.valid["Inflow"].iloc[1] == 12.50
+
+
+def test_validate_dataframe_non_numeric_amount():
+    """Test that a non-numeric single Amount field is rejected"""
+    df = pd.DataFrame({"Date": ["2023-01-01", "2023-01-02"], "Amount": ["-50.00", "n/a"]})
+    result = validate_dataframe(df)
+
+    assert len(result.valid) == 1
+    assert list(result.invalid["Reason"]) == [INVALID_AMOUNT]
+
+
+def test_parse_amounts_formats():
+    """Test parsing of common currency formats"""
+    parsed = parse_amounts(pd.Series(["$1,234.50", "(20.00)", " 3 ", "", "abc"]))
+    assert parsed.iloc[:3].tolist() == [1234.50, -20.00, 3.00]
+    assert parsed.iloc[3:].isna().all()
+
+
+def test_parse_dates_two_digit_year():
+    """Test parsing a date format pandas cannot infer on its own"""
+    parsed = parse_dates(pd.Series(["11/04/24", "12/31/24", "bad"]))
+    assert parsed.iloc[0] == pd.Timestamp("2024-11-04")
+    assert parsed.iloc[1] == pd.Timestamp("2024-12-31")
+    assert pd.isna(parsed.iloc[2])
+
+
+def test_infer_date_format_day_first():
+    """Test that a day-first date late in the column decides the format for the whole column"""
+    dates = pd.Series([f"{day:02d}/01/2024" for day in range(1, 13)] * 20 + ["13/01/2024", "20/01/2024"])
+
+    assert infer_date_format(dates) == "%d/%m/%Y"
+    assert parse_dates(dates).notna().all()
+
+
+def test_infer_date_format_ambiguous():
+    """Test that dates fitting both day-first and month-first formats are read month-first"""
+    assert infer_date_format(pd.Series(["01/02/2024", "05/01/2024"])) == "%m/%d/%Y"
+    assert infer_date_format(pd.Series(["01/02/24", "05/01/24"])) == "%m/%d/%y"
+
+    # The same day and month either way round is not ambiguous
+    assert infer_date_format(pd.Series(["01/01/2024", "02/02/2024"])) == "%m/%d/%Y"
+
+
+def test_validate_dataframe_date_format():
+    """Test that a given date format is applied as is, with no inference"""
+    df = pd.DataFrame({"Date": ["01/02/2024", "13/02/2024", "02/13/2024"], "Amount": ["1", "2", "3"]})
+    result = validate_dataframe(df, "%d/%m/%Y")
+
+    assert result.valid.index.tolist() == [0, 1]
+    assert list(result.invalid["Reason"]) == [INVALID_DATE]
+
+
+def test_line_description():
+    """Test describing rows of a single file and of merged files"""
+    assert line_description(0) == "line 2"
+    assert line_description(("2024-01.csv", 3)) == "2024-01.csv line 5"
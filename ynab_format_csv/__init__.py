@@ -0,0 +1,33 @@
+from loguru import logger
+
+from ynab_format_csv.__version__ import __version__
+from ynab_format_csv.api import convert, load_mapping
+from ynab_format_csv.dataclasses import FieldMapping
+from ynab_format_csv.exceptions import (
+    HistoryStoreError,
+    MappingError,
+    MappingFileError,
+    RateTableError,
+    TransactionFileError,
+    UploadError,
+    YnabFormatError,
+)
+from ynab_format_csv.validation import ValidationSummary
+
+# Stay quiet when embedded; the command line interface enables logging explicitly
+logger.disable("ynab_format_csv")
+
+__all__ = [
+    "FieldMapping",
+    "HistoryStoreError",
+    "MappingError",
+    "MappingFileError",
+    "RateTableError",
+    "TransactionFileError",
+    "UploadError",
+    "ValidationSummary",
+    "YnabFormatError",
+    "__version__",
+    "convert",
+    "load_mapping",
+]
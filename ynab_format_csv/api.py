@@ -0,0 +1,401 @@
+"""
+The public, embeddable interface to ynab_format_csv.
+
+Nothing in this module prints or exits: problems are raised as subclasses of
+YnabFormatError, and the command line interface is a thin wrapper around convert().
+"""
+
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from datetime import date
+from pathlib import Path
+from typing import IO, cast
+
+import pandas as pd
+
+from ynab_format_csv.collapse import collapse_pending_transactions
+from ynab_format_csv.dataclasses import FieldMapping
+from ynab_format_csv.daterange import DateRangeFilter
+from ynab_format_csv.exceptions import MappingError
+from ynab_format_csv.fileio import DEFAULT_CHUNKSIZE, iter_csv_transaction_file, read_field_mappings_from_yaml
+from ynab_format_csv.fx import CURRENCY_FIELD, CurrencyConverter
+from ynab_format_csv.mapping import filter_dataframe, is_mapped
+from ynab_format_csv.merge import merge_by_date
+from ynab_format_csv.validation import (
+    FILE_COLUMN,
+    ValidationResult,
+    ValidationSummary,
+    infer_date_format,
+    parse_dates,
+    validate_dataframe,
+)
+
+
+def load_mapping(mapping: list[FieldMapping] | Path | str) -> list[FieldMapping]:
+    """
+    Return a list of field mappings, reading them from a YAML file if a path is given.
+
+    Parameters
+    ----------
+    mapping : list[FieldMapping] | Path | str
+        Either the field mappings themselves, or the path to a saved mapping YAML file.
+
+    Returns
+    -------
+    list[FieldMapping]
+        The field mappings.
+
+    Raises
+    ------
+    MappingFileError
+        If the mapping file cannot be read.
+    """
+
+    if isinstance(mapping, str | Path):
+        return read_field_mappings_from_yaml(Path(mapping))
+
+    return mapping
+
+
+def convert(
+    source: Path | str | IO | Sequence[Path | str | IO],
+    mapping: list[FieldMapping] | Path | str,
+    *,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    summary: ValidationSummary | None = None,
+    on_invalid: Callable[[pd.DataFrame], None] | None = None,
+    collapse_pending: int | None = None,
+    split_by: str | None = None,
+    split_mappings: Mapping[str, list[FieldMapping] | Path | str] | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    fx_rates: Path | str | None = None,
+    base_currency: str = "",
+) -> Iterator[pd.DataFrame]:
+    """
+    Convert a bank transaction CSV file into batches of YNAB-formatted transactions.
+
+    The file is streamed in chunks of `chunksize` rows; each chunk is mapped to the YNAB
+    fields and validated before it is yielded, so memory use is bounded by the chunk size.
+    The exception is `collapse_pending`, which needs every row at once to find pairs that
+    span chunks, and so yields a single batch (one per mapping, with `split_mappings`).
+
+    Several files with the same layout (e.g. monthly statements of one account) can be
+    converted together. Their rows are merged into a single sequence ordered by date, with a
+    k-way merge of date-sorted chunks spilled to temporary files, so memory use is still
+    bounded by the chunk size.
+
+    Parameters
+    ----------
+    source : Path | str | IO | Sequence[Path | str | IO]
+        The path to the CSV transaction file, or an open file object, or a list or tuple of them to merge.
+    mapping : list[FieldMapping] | Path | str
+        The field mappings, or the path to a saved mapping YAML file.
+    chunksize : int, optional
+        The number of CSV rows processed at a time, by default DEFAULT_CHUNKSIZE.
+    summary : ValidationSummary, optional
+        If given, updated with the validation counts of every batch.
+    on_invalid : Callable[[pd.DataFrame], None], optional
+        If given, called with the quarantined rows of every batch that has any. When several
+        files are given, the rows have an extra File column naming the file they came from.
+    collapse_pending : int, optional
+        If given, drop pending transactions that reappear as posted transactions with the same
+        amount and payee no more than this many days later.
+    split_by : str, optional
+        The name of a CSV column (e.g. "Account Number") to carry through to the output batches,
+        unmapped and under its original name, so the rows can be partitioned by its value.
+        Pending/posted pairs are only collapsed within the same value.
+    split_mappings : Mapping[str, list[FieldMapping] | Path | str], optional
+        The field mappings, or paths to saved mapping YAML files, of the rows with particular values
+        of `split_by`, for accounts whose columns are mapped differently. Rows with any other value
+        use `mapping`. Only one source can be converted with per-value mappings.
+    on_progress : Callable[[int, int], None], optional
+        If given, called after each chunk is read with the number of bytes consumed from the
+        source so far and the number of rows read so far. When several files are given, the
+        counts run on from one file to the next.
+    since : date, optional
+        If given, drop transactions dated before this day as each chunk is read.
+    until : date, optional
+        If given, drop transactions dated after this day as each chunk is read. If the file turns
+        out to be sorted by date, reading stops as soon as it has passed the range.
+    fx_rates : Path | str, optional
+        The path to a CSV table of daily FX rates (Date, Currency, Rate). Required when the mapping
+        maps a Currency field; amounts in other currencies are converted using the latest rate on or
+        before the transaction date, and rows with no such rate are quarantined.
+    base_currency : str, optional
+        The account's currency code, required with `fx_rates`. Rows in this currency, or with a blank
+        currency, are not converted.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next batch of valid rows, with the YNAB field names as columns and dates as YYYY-MM-DD.
+        When several files are given, the rows are in date order and indexed by (file, line offset).
+
+    Raises
+    ------
+    MappingFileError
+        If the mapping file cannot be read.
+    MappingError
+        If the mapping does not match the transaction file, `split_by` is not a column in it,
+        `split_mappings` is given without `split_by` or with several sources, only one of a
+        Currency field and `fx_rates` is given, or `fx_rates` is given without `base_currency`.
+    RateTableError
+        If the FX rate table cannot be read.
+    TransactionFileError
+        If the transaction file cannot be read.
+    """
+
+    field_mapping: list[FieldMapping] = load_mapping(mapping)
+    key_mappings: dict[str, list[FieldMapping]] = {
+        key: load_mapping(key_mapping) for key, key_mapping in (split_mappings or {}).items()
+    }
+    # A path string or file object is itself iterable, so only a list or tuple means several sources
+    sources: list[Path | str | IO] = (
+        list(source) if isinstance(source, list | tuple) else [cast("Path | str | IO", source)]
+    )
+
+    if key_mappings and not split_by:
+        raise MappingError("Mappings for individual split values were given without a split column")
+    if key_mappings and len(sources) > 1:
+        raise MappingError("Mappings for individual split values can't be used when merging several files")
+
+    maps_currency: bool = any(
+        field.ynab_field == CURRENCY_FIELD and is_mapped(field)
+        for fields in (field_mapping, *key_mappings.values())
+        for field in fields
+    )
+    if maps_currency and fx_rates is None:
+        raise MappingError("The mapping includes a Currency field, but no FX rate table was given")
+    if fx_rates is not None and not maps_currency:
+        raise MappingError("An FX rate table was given, but the mapping does not include a Currency field")
+    if fx_rates is not None and not base_currency.strip():
+        raise MappingError("An FX rate table was given without the account's base currency")
+    fx: CurrencyConverter | None = CurrencyConverter.from_file(Path(fx_rates), base_currency) if fx_rates else None
+
+    batches: Iterator[pd.DataFrame]
+    if len(sources) == 1:
+        date_range: DateRangeFilter | None = DateRangeFilter(since, until) if since or until else None
+        batches = validated_batches(
+            sources[0],
+            field_mapping,
+            chunksize,
+            summary,
+            on_invalid,
+            split_by,
+            on_progress,
+            date_range,
+            fx,
+            key_mappings,
+        )
+    else:
+        batches = merge_by_date(
+            source_batches(
+                sources, field_mapping, chunksize, summary, on_invalid, split_by, on_progress, since, until, fx
+            ),
+            chunksize,
+        )
+
+    if collapse_pending is None:
+        yield from batches
+        return
+
+    # Batches mapped with different per-value mappings can have different columns, so collapse each kind apart
+    collected: dict[tuple[str, ...], list[pd.DataFrame]] = {}
+    for batch in batches:
+        collected.setdefault(tuple(batch.columns), []).append(batch)
+    for kind in collected.values():
+        yield collapse_pending_transactions(pd.concat(kind), collapse_pending, by=[split_by] if split_by else None)
+
+
+def validated_batches(
+    source: Path | str | IO,
+    field_mapping: list[FieldMapping],
+    chunksize: int,
+    summary: ValidationSummary | None,
+    on_invalid: Callable[[pd.DataFrame], None] | None,
+    split_by: str | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+    date_range: DateRangeFilter | None = None,
+    fx: CurrencyConverter | None = None,
+    split_mappings: dict[str, list[FieldMapping]] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read, map and validate the transaction file one chunk at a time.
+
+    The date format is taken from the Date field of the mapping or, failing that, inferred from the
+    first chunk, and then applied to every chunk of the file. With `split_mappings`, each chunk is
+    divided by split key and each part is mapped, and its date format settled, separately.
+
+    Parameters
+    ----------
+    source : Path | str | IO
+        The path to the CSV transaction file, or an open file object.
+    field_mapping : list[FieldMapping]
+        The field mappings.
+    chunksize : int
+        The number of CSV rows processed at a time.
+    summary : ValidationSummary | None
+        If given, updated with the validation counts of every batch.
+    on_invalid : Callable[[pd.DataFrame], None] | None
+        If given, called with the quarantined rows of every batch that has any.
+    split_by : str | None, optional
+        If given, the CSV column to append, unmapped, to every batch.
+    on_progress : Callable[[int, int], None] | None, optional
+        If given, called after each chunk is read with the bytes consumed and rows read so far.
+    date_range : DateRangeFilter | None, optional
+        If given, applied to each chunk straight after mapping; reading stops once it is finished.
+    fx : CurrencyConverter | None, optional
+        If given, converts the amounts of the valid rows of each chunk.
+    split_mappings : dict[str, list[FieldMapping]] | None, optional
+        The field mappings of the rows with each value of `split_by`, for values whose rows are not
+        mapped with `field_mapping`.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next non-empty batch of valid rows. With `split_mappings`, each batch holds the rows of
+        one mapping, and the batches of a chunk follow the order of the mappings.
+
+    Raises
+    ------
+    MappingError
+        If `split_by` is not a column in the file, or clashes with a mapped YNAB field.
+    """
+
+    # Rows whose split key has no mapping of its own use the main mapping, at position 0
+    mappings: list[list[FieldMapping]] = [field_mapping, *(split_mappings or {}).values()]
+    positions: dict[str, int] = {key: position for position, key in enumerate(split_mappings or {}, start=1)}
+    date_formats: list[str | None] = [
+        next((field.date_format for field in mapping if field.ynab_field == "Date" and field.date_format), None)
+        for mapping in mappings
+    ]
+
+    for chunk in iter_csv_transaction_file(source, chunksize, on_progress):
+        if split_by and split_by not in chunk.columns:
+            raise MappingError(f"The transaction file does not contain the split column: {split_by}")
+
+        parts: Iterable[tuple[int, pd.DataFrame]] = (
+            chunk.groupby(chunk[split_by].fillna("").astype(str).map(positions).fillna(0).astype(int))
+            if positions
+            else [(0, chunk)]
+        )
+
+        mapped_parts: dict[int, pd.DataFrame] = {}
+        dates: list[pd.Series] = []
+        for position, rows in parts:
+            mapped: pd.DataFrame = filter_dataframe(rows, mappings[position])
+
+            if split_by:
+                if split_by in mapped.columns:
+                    raise MappingError(f"The split column {split_by} has the same name as a mapped YNAB field")
+                mapped = mapped.assign(**{split_by: rows[split_by]})
+
+            if "Date" in mapped.columns:
+                # Settle the date format on the first chunk with dates, so every chunk of the file is read alike
+                if date_formats[position] is None:
+                    date_formats[position] = infer_date_format(mapped["Date"])
+                if date_range is not None:
+                    dates.append(parse_dates(mapped["Date"], date_formats[position]))
+
+            mapped_parts[position] = mapped
+
+        # The filter tracks whether the file is sorted, so it sees the dates of every part in file order
+        keep: pd.Series | None = (
+            date_range.keep(pd.concat(dates).reindex(chunk.index)) if date_range is not None and dates else None
+        )
+
+        for position, mapped in mapped_parts.items():
+            if keep is not None:
+                mapped = mapped.loc[keep.loc[mapped.index]]
+
+            result: ValidationResult = validate_dataframe(mapped, date_formats[position])
+            if fx is not None:
+                result = fx.apply(result)
+
+            if summary is not None:
+                summary.update(result)
+            if on_invalid is not None and not result.invalid.empty:
+                on_invalid(result.invalid)
+
+            if not result.valid.empty:
+                yield result.valid
+
+        if date_range is not None and date_range.finished:
+            break
+
+
+def source_batches(
+    sources: list[Path | str | IO],
+    field_mapping: list[FieldMapping],
+    chunksize: int,
+    summary: ValidationSummary | None,
+    on_invalid: Callable[[pd.DataFrame], None] | None,
+    split_by: str | None,
+    on_progress: Callable[[int, int], None] | None,
+    since: date | None,
+    until: date | None,
+    fx: CurrencyConverter | None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read, map and validate several transaction files in turn, each with validated_batches().
+
+    Parameters
+    ----------
+    sources : list[Path | str | IO]
+        The paths to the CSV transaction files, or open file objects.
+    field_mapping : list[FieldMapping]
+        The field mappings, shared by every file.
+    chunksize : int
+        The number of CSV rows processed at a time.
+    summary : ValidationSummary | None
+        If given, updated with the validation counts of every batch of every file.
+    on_invalid : Callable[[pd.DataFrame], None] | None
+        If given, called with the quarantined rows of every batch that has any, with a File column
+        naming the file they came from.
+    split_by : str | None
+        If given, the CSV column to append, unmapped, to every batch.
+    on_progress : Callable[[int, int], None] | None
+        If given, called after each chunk is read with the bytes consumed and rows read so far,
+        counted across all of the files.
+    since : date | None
+        If given, drop transactions dated before this day.
+    until : date | None
+        If given, drop transactions dated after this day.
+    fx : CurrencyConverter | None
+        If given, converts the amounts of the valid rows of each chunk.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next non-empty batch of valid rows, from each file in turn, indexed by (file, line offset).
+        The file is the path as given, or the name of a file object.
+    """
+
+    # Bytes and rows read from the files already finished, and from the current file so far
+    finished: list[int] = [0, 0]
+    current: list[int] = [0, 0]
+
+    def report(bytes_read: int, rows: int) -> None:
+        current[:] = [bytes_read, rows]
+        if on_progress is not None:
+            on_progress(finished[0] + bytes_read, finished[1] + rows)
+
+    for position, source in enumerate(sources, start=1):
+        label: str = str(source) if isinstance(source, str | Path) else str(getattr(source, "name", "") or position)
+        name: str = Path(label).name
+
+        def quarantine(invalid: pd.DataFrame, name: str = name) -> None:
+            if on_invalid is not None:
+                on_invalid(invalid.assign(**{FILE_COLUMN: name})[[FILE_COLUMN, *invalid.columns]])
+
+        # Each file gets its own date range filter, as it stops reading once a sorted file is past the range
+        date_range: DateRangeFilter | None = DateRangeFilter(since, until) if since or until else None
+        for batch in validated_batches(
+            source, field_mapping, chunksize, summary, quarantine, split_by, report, date_range, fx
+        ):
+            # Label every row with its file as well as its line offset, so it can still be traced once merged
+            yield batch.set_axis(pd.MultiIndex.from_product([[label], batch.index]))
+
+        finished[:] = [finished[0] + current[0], finished[1] + current[1]]
+        current[:] = [0, 0]
@@ -1,20 +1,35 @@
+from contextlib import nullcontext
+from datetime import datetime
 from pathlib import Path
-from sys import exit, stderr
-from typing import Annotated
+from sys import stderr
+from typing import Annotated, NoReturn
 
+import click
 import pandas as pd
 import typer
 from loguru import logger
 from rich import print as rprint
+from rich.progress import TaskID
+from typer.core import TyperGroup
 
 from ynab_format_csv.__version__ import __version__
+from ynab_format_csv.api import convert
 from ynab_format_csv.dataclasses import FieldMapping
+from ynab_format_csv.exceptions import MappingError, MappingFileError, YnabFormatError
 from ynab_format_csv.fileio import (
+    CsvBatchWriter,
+    SplitCsvWriter,
+    output_file_path,
     read_csv_transaction_file,
     read_field_mappings_from_yaml,
-    write_dataframe_to_csv_file,
     write_field_mappings_to_yaml,
 )
+from ynab_format_csv.history import HISTORY_COLUMNS, HistoryWriter, query_history, source_digest
+from ynab_format_csv.mapping import generate_ynab_header_fields
+from ynab_format_csv.progress import conversion_progress
+from ynab_format_csv.transfers import TRANSFER_PAYEE_PREFIX, match_transfers
+from ynab_format_csv.upload import DEFAULT_BASE_URL, YnabUploader
+from ynab_format_csv.validation import ValidationSummary
 
 
 def set_logging_level(verbosity: int) -> None:
@@ -45,42 +60,15 @@ def set_logging_level(verbosity: int) -> None:
         else:
             log_level = "ERROR"
 
-    logger.remove(0)
+    # Replace any existing handlers, so the CLI can be invoked more than once in the same process
+    logger.remove()
     # noinspection PyUnboundLocalVariable
     logger.add(stderr, level=log_level)
+    logger.enable("ynab_format_csv")
 
     return None
 
 
-def generate_ynab_header_fields() -> list[FieldMapping]:
-    """
-    Generate and return the list of YNAB header fields.
-
-    Available fields taken from YNAB documentation:
-    https://support.ynab.com/en_us/formatting-a-csv-file-an-overview-BJvczkuRq#texteditor
-
-    Returns
-    -------
-    list[FieldMapping]
-        A list of FieldMapping objects representing the YNAB header fields with the following fields:
-        - Date
-        - Payee
-        - Memo
-        - Amount (single field for both inflow and outflow)
-        - Outflow (used if separate fields)
-        - Inflow (used if separate fields)
-    """
-
-    return [
-        FieldMapping(ynab_field="Date"),
-        FieldMapping(ynab_field="Payee"),
-        FieldMapping(ynab_field="Memo"),
-        FieldMapping(ynab_field="Amount", note="A single field for both inflow and outflow"),
-        FieldMapping(ynab_field="Outflow", note="Used if separate fields are used for inflow and outflow"),
-        FieldMapping(ynab_field="Inflow", note="Used if separate fields are used for inflow and outflow"),
-    ]
-
-
 def print_sample_rows(df: pd.DataFrame, num_rows: int = 5) -> None:
     """
     Print a sample of the rows from the CSV file, to help the user see what the data looks like.
@@ -178,45 +166,31 @@ def map_csv_header_fields(ynab_header_fields: list[FieldMapping], csv_header_fie
     return ynab_header_fields
 
 
-def filter_dataframe(df: pd.DataFrame, field_mapping: list[FieldMapping]) -> pd.DataFrame:
+def print_validation_summary(summary: ValidationSummary) -> None:
     """
-    Filter and rename the transaction entries based on the field mapping.
+    Print the number of valid and quarantined rows, with a count for each failure reason.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        The CSV transaction data as a DataFrame.
-    field_mapping : list[FieldMapping]
-        A list of FieldMapping objects that define the mapping between CSV fields and YNAB fields.
+    summary : ValidationSummary
+        The validation totals for the converted transaction data.
 
     Returns
     -------
-    pd.DataFrame
-        The filtered and renamed CSV transaction data as a DataFrame.
-
-    Raises
-    ------
-    KeyError
-        If the saved mapping file does not match the transaction file structure.
+    None
     """
 
-    fields: list[str] = [
-        field.ynab_field for field in field_mapping if (field.csv_field and field.csv_field.lower() != "skipped")
-    ]
-
-    mapping_dict: dict = {field.csv_field: field.ynab_field for field in field_mapping}
-
-    # Rename the columns based on the field mapping
-    df.rename(columns=mapping_dict, inplace=True)
-    try:
-        modified_df: pd.DataFrame = df[fields]
-    except KeyError:
-        rprint("[red]Hmmm.... It looks like the saved mapping file does not match the transaction file.[/red]")
-        print("Please check that the correct files are being used.")
+    print(f"Valid rows: {summary.valid_rows}")
+    if not summary.invalid_rows:
         print()
-        exit(1)
+        return None
 
-    return modified_df
+    rprint(f"[yellow]Quarantined rows: {summary.invalid_rows}[/yellow]")
+    for reason, count in summary.reasons.most_common():
+        print(f"\t{count}\t{reason}")
+    print()
+
+    return None
 
 
 def prompt_to_save_mapping(field_mapping: list[FieldMapping]) -> None:
@@ -243,11 +217,36 @@ def prompt_to_save_mapping(field_mapping: list[FieldMapping]) -> None:
 
     if save_mapping:
         file_path: Path = typer.prompt("Enter the path to save the mapping file", type=Path)
-        write_field_mappings_to_yaml(field_mapping, file_path)
+        try:
+            write_field_mappings_to_yaml(field_mapping, file_path)
+        except MappingFileError as e:
+            exit_with_error(e)
+        print(f"Field mappings written to {file_path}")
 
     return None
 
 
+def exit_with_error(error: YnabFormatError) -> NoReturn:
+    """
+    Print an error raised by the library and exit with a non-zero status.
+
+    Parameters
+    ----------
+    error : YnabFormatError
+        The error to report.
+
+    Raises
+    ------
+    typer.Exit
+        Always, with exit code 1.
+    """
+
+    rprint(f"[red]{error}[/red]")
+    print()
+
+    raise typer.Exit(1)
+
+
 def version_callback(value: bool) -> None:
     """
     Print the version of the package and exit.
@@ -275,12 +274,44 @@ def version_callback(value: bool) -> None:
     return None
 
 
-app = typer.Typer(add_completion=False, context_settings={"help_option_names": ["-h", "--help"]})
+class DefaultCommandGroup(TyperGroup):
+    """
+    A command group that falls back to a default command when no subcommand is named.
+
+    This keeps the original `ynab-format-csv CSV_FILE [OPTIONS]` invocation working
+    alongside subcommands such as `ynab-format-csv query`.
+    """
+
+    default_command: str = "convert"
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        """Insert the default command name unless a subcommand or help was requested."""
+
+        if not args or (args[0] not in self.commands and args[0] not in ctx.help_option_names):
+            args.insert(0, self.default_command)
+
+        return super().parse_args(ctx, args)
+
+
+app = typer.Typer(
+    cls=DefaultCommandGroup,
+    add_completion=False,
+    context_settings={"help_option_names": ["-h", "--help"]},
+    help="Prepare CSV transaction files for import into YNAB.",
+)
 
 
-@app.command()
+@app.command("convert")
 def main(
-    csv_file: Annotated[Path, typer.Argument(help="Input CSV File")],
+    csv_files: Annotated[
+        list[Path],
+        typer.Argument(
+            help="Input CSV file(s); several files for one account are merged into one file, by date",
+            file_okay=True,
+            dir_okay=False,
+            exists=True,
+        ),
+    ],
     config_file: Annotated[
         Path,
         typer.Option(
@@ -298,6 +329,86 @@ def main(
             "-o", "--outdir", help="Directory in which to save the updated CSV file.", file_okay=False, dir_okay=True
         ),
     ],
+    collapse_pending: Annotated[
+        int | None,
+        typer.Option(
+            "--collapse-pending",
+            metavar="DAYS",
+            min=0,
+            help="Drop pending transactions that reappear as posted, with the same amount and payee, within DAYS days",
+        ),
+    ] = None,
+    since: Annotated[
+        datetime | None,
+        typer.Option("--since", formats=["%Y-%m-%d"], help="Only convert transactions on or after this date"),
+    ] = None,
+    until: Annotated[
+        datetime | None,
+        typer.Option("--until", formats=["%Y-%m-%d"], help="Only convert transactions on or before this date"),
+    ] = None,
+    fx_rates: Annotated[
+        Path | None,
+        typer.Option(
+            "--fx-rates",
+            help="CSV table of daily FX rates (Date, Currency, Rate), used when the mapping includes a Currency field",
+            file_okay=True,
+            dir_okay=False,
+            exists=True,
+        ),
+    ] = None,
+    base_currency: Annotated[
+        str,
+        typer.Option(
+            "--base-currency",
+            metavar="CODE",
+            help="The account's currency, required with --fx-rates; rows in it are not converted",
+        ),
+    ] = "",
+    split_by: Annotated[
+        str | None,
+        typer.Option(
+            "--split-by",
+            metavar="COLUMN",
+            help="Write a separate YNAB file for each value of this CSV column, e.g. 'Account Number'",
+        ),
+    ] = None,
+    split_mappings: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--split-mapping",
+            metavar="VALUE=FILE",
+            help="Map the rows with this --split-by value using a different mapping YAML file; repeat as needed",
+        ),
+    ] = None,
+    history_dir: Annotated[
+        Path | None,
+        typer.Option(
+            "--history",
+            help="Also save the converted transactions to the Parquet history store in this directory",
+            file_okay=False,
+            dir_okay=True,
+        ),
+    ] = None,
+    ynab_budget: Annotated[
+        str | None,
+        typer.Option("--ynab-budget", metavar="ID", help="Also upload the transactions to this YNAB budget"),
+    ] = None,
+    ynab_account: Annotated[
+        str | None,
+        typer.Option("--ynab-account", metavar="ID", help="The YNAB account to upload the transactions to"),
+    ] = None,
+    ynab_token: Annotated[
+        str | None,
+        typer.Option(
+            "--ynab-token",
+            envvar="YNAB_ACCESS_TOKEN",
+            show_envvar=True,
+            help="A YNAB personal access token, used to upload the transactions",
+        ),
+    ] = None,
+    ynab_base_url: Annotated[
+        str, typer.Option("--ynab-base-url", metavar="URL", help="The base URL of the YNAB API")
+    ] = DEFAULT_BASE_URL,
     verbosity: Annotated[int, typer.Option("-v", "--verbosity", help="Repeat for debug messaging", count=True)] = 0,
     version: Annotated[
         bool,
@@ -316,12 +427,40 @@ def main(
 
     Parameters
     ----------
-    csv_file : Path
-        Path to the CSV file containing bank transaction data.
+    csv_files : list[Path]
+        Paths to the CSV files containing bank transaction data. Several files must share the same
+        layout; their transactions are merged into a single output, ordered by date.
     config_file : Path, optional
         Path to a YAML file containing saved field mappings.
     output_dir : Path, optional
         Directory where the formatted CSV file should be saved.
+    collapse_pending : int, optional
+        If given, collapse pending/posted pairs of the same transaction no more than this many days apart.
+    since : datetime, optional
+        If given, skip transactions dated before this day.
+    until : datetime, optional
+        If given, skip transactions dated after this day.
+    fx_rates : Path, optional
+        A CSV table of daily FX rates, used to convert foreign-currency transactions.
+    base_currency : str, optional
+        The account's currency code, required with `fx_rates`; transactions in it are not converted.
+    split_by : str, optional
+        If given, write one output file per value of this CSV column.
+    split_mappings : list[str], optional
+        "VALUE=FILE" pairs giving the mapping YAML file for the rows with each value of `split_by`.
+        Rows with other values use `config_file`. Rows failing validation are then also written to
+        one file per value, as the mappings can give them different columns.
+    history_dir : Path, optional
+        If given, save the converted transactions to the Parquet history store in this directory once
+        the conversion succeeds, replacing those of any earlier conversion of the same file(s).
+    ynab_budget : str, optional
+        If given, upload the converted transactions to this YNAB budget.
+    ynab_account : str, optional
+        The YNAB account to upload the transactions to. Required with `ynab_budget`.
+    ynab_token : str, optional
+        The YNAB personal access token. Required with `ynab_budget`.
+    ynab_base_url : str, optional
+        The base URL of the YNAB API, by default DEFAULT_BASE_URL.
     verbosity : int, optional
         Logging verbosity level (0=ERROR, 1=INFO, >1=DEBUG), by default 0.
     version : bool, optional
@@ -337,25 +476,57 @@ def main(
     1. Read the input CSV file
     2. Either use provided field mappings or prompt for new ones
     3. Filter and rename fields according to the mapping
-    4. Save the resulting file with '.ynab.csv' extension
-    5. Optionally save the field mapping for future use
+    4. Validate each row, quarantining rows that break the YNAB import rules
+    5. Save the valid rows with '.ynab.csv' extension (one file per value of the split column, if given),
+       and any failing rows with '.quarantine.csv' extension. Several input files are merged by date
+       into files named after the first, with '.merged.ynab.csv' and '.merged.quarantine.csv' extensions
+    6. Optionally save the valid rows to a Parquet history store
+    7. Optionally upload the valid rows to a YNAB account
+    8. Optionally save the field mapping for future use
     """
 
     # Set the logging level
     set_logging_level(verbosity)
 
-    # Read the CSV file
-    df: pd.DataFrame = read_csv_transaction_file(csv_file)
+    if ynab_budget and not (ynab_account and ynab_token):
+        raise typer.BadParameter("--ynab-account and --ynab-token are required to upload", param_hint="'--ynab-budget'")
+    if ynab_budget and split_by:
+        raise typer.BadParameter("cannot be combined with --split-by", param_hint="'--ynab-budget'")
+    if fx_rates and not base_currency.strip():
+        raise typer.BadParameter("requires --base-currency", param_hint="'--fx-rates'")
+    if split_mappings and not split_by:
+        raise typer.BadParameter("requires --split-by", param_hint="'--split-mapping'")
+    if split_mappings and len(csv_files) > 1:
+        raise typer.BadParameter("cannot be used when merging several files", param_hint="'--split-mapping'")
+    key_mappings: dict[str, Path] = {}
+    for split_mapping in split_mappings or []:
+        key, separator, file_name = split_mapping.partition("=")
+        if not separator or not file_name:
+            raise typer.BadParameter(f"expected VALUE=FILE, got {split_mapping!r}", param_hint="'--split-mapping'")
+        key_mappings[key] = Path(file_name)
+
+    # Name the output after the first input file
+    csv_file: Path = csv_files[0]
+    merged: str = ".merged" if len(csv_files) > 1 else ""
+
+    # Read a sample of the CSV file, to show the user and to offer its header fields for mapping
+    try:
+        sample_df: pd.DataFrame = read_csv_transaction_file(csv_file, nrows=5)
+    except YnabFormatError as e:
+        exit_with_error(e)
 
-    # Read the header fields
-    header_fields: list[str] = df.columns.tolist()
+    header_fields: list[str] = sample_df.columns.tolist()
     ynab_header_fields: list[FieldMapping] = generate_ynab_header_fields()
-    print_sample_rows(df)
+    print_sample_rows(sample_df)
 
     mapping: list[FieldMapping] = []
 
     if config_file:
-        mapping = read_field_mappings_from_yaml(config_file)
+        try:
+            mapping = read_field_mappings_from_yaml(config_file)
+        except MappingFileError as e:
+            rprint(f"[red]{e}[/red]")
+            print()
 
     # If there's an error reading the YAML mapping, the resulting list will still be empty
     if not mapping:
@@ -363,19 +534,287 @@ def main(
 
     print("Field mapping:")
     for item in mapping:
-        print(f"\t{item.ynab_field}\t<- {item.csv_field}")
+        print(f"\t{item.ynab_field}\t<- {item.template or item.csv_field}")
     print()
 
-    updated_df: pd.DataFrame = filter_dataframe(df, mapping)
+    # Stream the converted rows to the output file, and the rows failing validation to a quarantine file
+    summary: ValidationSummary = ValidationSummary()
+    output_path: Path = output_file_path(output_dir, csv_file, f"{merged}.ynab.csv")
+    quarantine_path: Path = output_file_path(output_dir, csv_file, f"{merged}.quarantine.csv")
+
+    writer: CsvBatchWriter | SplitCsvWriter = (
+        SplitCsvWriter(output_dir, csv_file, f"{merged}.ynab.csv", split_by)
+        if split_by
+        else CsvBatchWriter(output_path)
+    )
+    # Per-value mappings can give the failing rows of each value different columns, so keep them apart
+    quarantine: CsvBatchWriter | SplitCsvWriter = (
+        SplitCsvWriter(output_dir, csv_file, f"{merged}.quarantine.csv", split_by)
+        if split_by and key_mappings
+        else CsvBatchWriter(quarantine_path)
+    )
 
-    # Print sample of the updated dataframe
-    print_sample_rows(updated_df)
-
-    # Write the updated DataFrame to a new CSV file
-    write_dataframe_to_csv_file(updated_df, output_dir, csv_file.with_suffix(".ynab.csv"))
+    try:
+        uploader: YnabUploader | None = (
+            YnabUploader(ynab_budget, ynab_account, ynab_token, base_url=ynab_base_url)
+            if ynab_budget and ynab_account and ynab_token
+            else None
+        )
+        source: str = ", ".join(file.name for file in csv_files)
+        history: HistoryWriter | None = (
+            HistoryWriter(history_dir, source, source_digest(csv_files)) if history_dir else None
+        )
+        with (
+            writer,
+            quarantine,
+            history or nullcontext(),
+            uploader or nullcontext(),
+            conversion_progress() as progress,
+        ):
+            task: TaskID = progress.add_task(
+                csv_file.name if len(csv_files) == 1 else f"{len(csv_files)} files",
+                total=sum(file.stat().st_size for file in csv_files),
+                rows=0,
+            )
+            for batch in convert(
+                csv_files,
+                mapping,
+                summary=summary,
+                on_invalid=quarantine.write,
+                collapse_pending=collapse_pending,
+                split_by=split_by,
+                split_mappings=key_mappings,
+                since=since.date() if since else None,
+                until=until.date() if until else None,
+                fx_rates=fx_rates,
+                base_currency=base_currency,
+                on_progress=lambda bytes_read, rows: progress.update(task, completed=bytes_read, rows=rows),
+            ):
+                # Print sample of the updated data
+                if not writer.rows:
+                    print_sample_rows(batch)
+                writer.write(batch)
+                if history:
+                    history.write(batch, account=batch[split_by] if split_by else "")
+                if uploader:
+                    uploader.upload(batch)
+    except MappingError as e:
+        rprint("[red]Hmmm.... It looks like the saved mapping file does not match the transaction file.[/red]")
+        print(e)
+        print("Please check that the correct files are being used.")
+        print()
+        raise typer.Exit(1) from e
+    except YnabFormatError as e:
+        exit_with_error(e)
+
+    print_validation_summary(summary)
+
+    if isinstance(writer, SplitCsvWriter):
+        for key, key_writer in writer.writers.items():
+            print(f"Updated data for {split_by} {key!r} ({key_writer.rows} rows) written to {key_writer.file_path}")
+    elif writer.rows:
+        print(f"Updated data written to {output_path}")
+    if not writer.rows:
+        rprint("[yellow]No valid rows found; no output file was written.[/yellow]")
+    if isinstance(quarantine, SplitCsvWriter):
+        for key, key_writer in quarantine.writers.items():
+            print(f"Rows failing validation for {split_by} {key!r} written to {key_writer.file_path}")
+    elif quarantine.rows:
+        print(f"Rows failing validation written to {quarantine_path}")
+    if history and history.rows:
+        print(f"Transactions saved to history store {history_dir}")
+    if uploader:
+        print(f"Uploaded {uploader.created} transaction(s) to YNAB ({uploader.duplicates} already imported)")
+    print()
 
     # Prompt to save the field mapping to a YAML file
     if not config_file:
         prompt_to_save_mapping(mapping)
 
     return None
+
+
+@app.command("transfers")
+def transfers(
+    csv_files: Annotated[
+        list[Path],
+        typer.Argument(help="Input CSV files, one per account", file_okay=True, dir_okay=False, exists=True),
+    ],
+    config_files: Annotated[
+        list[Path],
+        typer.Option(
+            "-c",
+            "--config",
+            help="The YAML field mapping file; give it once for all files, or once per file in the same order",
+            file_okay=True,
+            dir_okay=False,
+            exists=True,
+        ),
+    ],
+    output_dir: Annotated[
+        Path,
+        typer.Option(
+            "-o", "--outdir", help="Directory in which to save the updated CSV files.", file_okay=False, dir_okay=True
+        ),
+    ],
+    names: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--name",
+            help="The YNAB account name for each file, in the same order; by default the file name without extension",
+        ),
+    ] = None,
+    window: Annotated[
+        int,
+        typer.Option("--window", metavar="DAYS", min=0, help="The most days apart the two sides of a transfer can be"),
+    ] = 3,
+    verbosity: Annotated[int, typer.Option("-v", "--verbosity", help="Repeat for debug messaging", count=True)] = 0,
+) -> None:
+    """
+    Convert the exports of several accounts and mark the transfers between them.
+
+    Parameters
+    ----------
+    csv_files : list[Path]
+        Paths to the CSV files, one per account.
+    config_files : list[Path]
+        Paths to the YAML field mapping files: one for all of the CSV files, or one per CSV file.
+    output_dir : Path
+        Directory where the formatted CSV files should be saved.
+    names : list[str], optional
+        The YNAB account name for each CSV file, by default the file names without extension.
+    window : int, optional
+        The maximum number of days between the two sides of a transfer, by default 3.
+    verbosity : int, optional
+        Logging verbosity level (0=ERROR, 1=INFO, >1=DEBUG), by default 0.
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    Each file is converted as by the convert command. Outflows from one account with an inflow of
+    the same amount into another account, no more than `window` days apart, then have their Payee
+    set to "Transfer : <other account name>" so that YNAB links them on import.
+    """
+
+    set_logging_level(verbosity)
+
+    if len(config_files) not in (1, len(csv_files)):
+        raise typer.BadParameter("Give one mapping file, or one per CSV file", param_hint="'-c' / '--config'")
+    if names and len(names) != len(csv_files):
+        raise typer.BadParameter("Give one account name per CSV file", param_hint="'--name'")
+
+    account_names: list[str] = names or [csv_file.stem for csv_file in csv_files]
+    if len(set(account_names)) != len(account_names):
+        raise typer.BadParameter("Account names must be unique", param_hint="'--name'")
+    mapping_files: list[Path] = config_files * len(csv_files) if len(config_files) == 1 else config_files
+
+    summary: ValidationSummary = ValidationSummary()
+    accounts: dict[str, pd.DataFrame] = {}
+
+    try:
+        for name, csv_file, mapping_file in zip(account_names, csv_files, mapping_files, strict=True):
+            quarantine_path: Path = output_file_path(output_dir, csv_file, ".quarantine.csv")
+            with CsvBatchWriter(quarantine_path) as quarantine:
+                batches: list[pd.DataFrame] = list(
+                    convert(csv_file, mapping_file, summary=summary, on_invalid=quarantine.write)
+                )
+            accounts[name] = pd.concat(batches) if batches else pd.DataFrame()
+            if quarantine.rows:
+                print(f"Rows of {csv_file.name} failing validation written to {quarantine_path}")
+
+        matched: dict[str, pd.DataFrame] = match_transfers(accounts, window)
+
+        for name, csv_file in zip(account_names, csv_files, strict=True):
+            if matched[name].empty:
+                rprint(f"[yellow]{name}: no valid rows found; no output file was written.[/yellow]")
+                continue
+            with CsvBatchWriter(output_file_path(output_dir, csv_file, ".ynab.csv")) as writer:
+                writer.write(matched[name])
+            transfer_count: int = int(matched[name]["Payee"].str.startswith(TRANSFER_PAYEE_PREFIX, na=False).sum())
+            print(f"{name}: {writer.rows} rows, {transfer_count} transfer(s), written to {writer.file_path}")
+    except YnabFormatError as e:
+        exit_with_error(e)
+
+    print()
+    print_validation_summary(summary)
+
+    return None
+
+
+@app.command("query")
+def query(
+    history_dir: Annotated[
+        Path,
+        typer.Argument(help="The Parquet history store directory", file_okay=False, dir_okay=True, exists=True),
+    ],
+    payee: Annotated[
+        str | None, typer.Option("-p", "--payee", help="Only show transactions whose payee contains this text")
+    ] = None,
+    since: Annotated[
+        datetime | None,
+        typer.Option("--since", formats=["%Y-%m-%d"], help="Only show transactions on or after this date"),
+    ] = None,
+    until: Annotated[
+        datetime | None,
+        typer.Option("--until", formats=["%Y-%m-%d"], help="Only show transactions on or before this date"),
+    ] = None,
+    columns: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--column",
+            help=f"Column to show; repeat for more. Choose from: {', '.join(HISTORY_COLUMNS)}",
+        ),
+    ] = None,
+    verbosity: Annotated[int, typer.Option("-v", "--verbosity", help="Repeat for debug messaging", count=True)] = 0,
+) -> None:
+    """
+    Query the Parquet transaction history store.
+
+    Parameters
+    ----------
+    history_dir : Path
+        The root directory of the history store.
+    payee : str, optional
+        Only show transactions whose payee contains this text (case-insensitive).
+    since : datetime, optional
+        Only show transactions on or after this date.
+    until : datetime, optional
+        Only show transactions on or before this date.
+    columns : list[str], optional
+        The columns to show, by default all of them.
+    verbosity : int, optional
+        Logging verbosity level (0=ERROR, 1=INFO, >1=DEBUG), by default 0.
+
+    Returns
+    -------
+    None
+    """
+
+    set_logging_level(verbosity)
+
+    try:
+        df: pd.DataFrame = query_history(
+            history_dir,
+            payee=payee,
+            since=since.date() if since else None,
+            until=until.date() if until else None,
+            columns=columns,
+        )
+    except YnabFormatError as e:
+        exit_with_error(e)
+
+    if df.empty:
+        print("No matching transactions found.")
+        return None
+
+    print(df.to_string(index=False))
+    print()
+    print(f"{len(df)} transaction(s)", end="")
+    if "amount" in df.columns:
+        print(f", totalling {df['amount'].sum():.2f}", end="")
+    print()
+
+    return None
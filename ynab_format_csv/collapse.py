@@ -0,0 +1,101 @@
+"""
+Collapse pending/posted pairs of the same transaction within a single export.
+
+Rows are sorted by (amount, normalized payee, date), which brings every candidate pair
+next to each other; pairs are then found by comparing each row with its neighbour.
+The sort dominates, so the whole step is O(n log n).
+"""
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ynab_format_csv.mapping import amount_in_cents
+from ynab_format_csv.validation import line_description, parse_dates
+
+
+def normalize_payee(payee: pd.Series) -> pd.Series:
+    """
+    Normalize payee names so that minor formatting differences compare equal.
+
+    Parameters
+    ----------
+    payee : pd.Series
+        The Payee column.
+
+    Returns
+    -------
+    pd.Series
+        The payees in upper case, with punctuation removed and runs of whitespace collapsed.
+    """
+
+    return (
+        payee.fillna("")
+        .astype(str)
+        .str.upper()
+        .str.replace(r"[^\w\s]", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def collapse_pending_transactions(df: pd.DataFrame, tolerance_days: int, by: list[str] | None = None) -> pd.DataFrame:
+    """
+    Drop pending transactions that reappear later in the same export as posted transactions.
+
+    A pending/posted pair is two rows with the same amount and normalized payee, whose dates
+    are no more than `tolerance_days` apart. The earlier (pending) row is dropped and the later
+    (posted) row is kept. When several matching rows fall within the tolerance of each other,
+    they are paired off in date order, so each row is collapsed at most once.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Validated transaction data, with the YNAB field names as columns.
+    tolerance_days : int
+        The maximum number of days between a pending row and its posted row.
+    by : list[str], optional
+        Additional columns (e.g. an account number) that must also match for rows to pair.
+
+    Returns
+    -------
+    pd.DataFrame
+        The transaction data without the pending rows, in the original order.
+    """
+
+    if df.empty or "Date" not in df.columns or "Payee" not in df.columns:
+        return df
+
+    group_columns: list[str] = [f"by_{i}" for i in range(len(by or []))] + ["cents", "payee"]
+    keys: pd.DataFrame = pd.DataFrame(
+        {
+            **{f"by_{i}": df[column].fillna("").astype(str) for i, column in enumerate(by or [])},
+            "cents": amount_in_cents(df),
+            "payee": normalize_payee(df["Payee"]),
+            "date": parse_dates(df["Date"]),
+            "position": np.arange(len(df)),
+        },
+        index=df.index,
+    ).sort_values([*group_columns, "date", "position"], kind="mergesort")
+
+    # A row is linked to the previous row when they share amount and payee and are close enough in date
+    same_group: pd.Series = keys[group_columns].eq(keys[group_columns].shift()).all(axis=1)
+    linked: pd.Series = same_group & (keys["date"] - keys["date"].shift()).dt.days.le(tolerance_days)
+
+    # Within each run of linked rows, pair the 1st with the 2nd, the 3rd with the 4th, and so on
+    run: pd.Series = (~linked).cumsum()
+    position_in_run: pd.Series = keys.groupby(run).cumcount()
+    pending: pd.Series = linked.shift(-1, fill_value=False) & position_in_run.mod(2).eq(0)
+    posted: pd.Series = pending.shift(1, fill_value=False)
+
+    pending_index: pd.Index = keys.index[pending.to_numpy()]
+    posted_index: pd.Index = keys.index[posted.to_numpy()]
+
+    for pending_row, posted_row in zip(pending_index, posted_index, strict=True):
+        logger.info(
+            f"Collapsed pending transaction on {line_description(pending_row)} "
+            f"({df.at[pending_row, 'Date']}, {df.at[pending_row, 'Payee']}) "
+            f"into posted transaction on {line_description(posted_row)} ({df.at[posted_row, 'Date']})"
+        )
+
+    return df.drop(index=pending_index)
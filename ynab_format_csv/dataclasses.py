@@ -19,8 +19,16 @@ class FieldMapping:
         The name of the corresponding field in the CSV file. Defaults to an empty string.
     note : str, optional
         An optional note about the field mapping. Defaults to an empty string.
+    template : str, optional
+        A template combining several CSV fields into this field, e.g. "{Category} / {Transaction Type}".
+        When set, it is used instead of csv_field. Defaults to an empty string.
+    date_format : str, optional
+        The strptime format of the dates in this field, e.g. "%d/%m/%Y". Only used for the Date field;
+        when empty, the format is inferred from the file. Defaults to an empty string.
     """
 
     ynab_field: str
     csv_field: str = ""
     note: str = ""
+    template: str = ""
+    date_format: str = ""
@@ -0,0 +1,102 @@
+"""
+Date-range filtering applied while the transaction file is being read.
+
+Each chunk is trimmed to the requested range as soon as it is mapped, before validation or
+any later step sees it. The filter also tracks whether the dates seen so far are sorted, so
+that reading can stop as soon as a sorted file has moved past the end of the range.
+"""
+
+from datetime import date
+
+import pandas as pd
+from loguru import logger
+
+from ynab_format_csv.validation import line_description
+
+
+class DateRangeFilter:
+    """
+    Keep only the rows whose Date falls within [since, until], chunk by chunk.
+
+    Rows whose Date cannot be parsed are kept, so validation can quarantine them.
+
+    Attributes
+    ----------
+    since : date | None
+        The first date to keep, or None for no lower bound.
+    until : date | None
+        The last date to keep, or None for no upper bound.
+    finished : bool
+        True once the dates seen so far are sorted and have passed the range, meaning no later
+        row can fall inside it and reading can stop.
+    """
+
+    def __init__(self, since: date | None = None, until: date | None = None) -> None:
+        self.since: pd.Timestamp | None = pd.Timestamp(since) if since else None
+        self.until: pd.Timestamp | None = pd.Timestamp(until) if until else None
+        self.finished: bool = False
+        self._ascending: bool = True
+        self._descending: bool = True
+        self._first: pd.Timestamp | None = None
+        self._last: pd.Timestamp | None = None
+
+    def keep(self, dates: pd.Series) -> pd.Series:
+        """
+        Return a mask of the dates of the next chunk that are within the range.
+
+        Parameters
+        ----------
+        dates : pd.Series
+            The parsed dates of the next chunk, in file order, with NaT for unparseable dates.
+
+        Returns
+        -------
+        pd.Series
+            A boolean mask, True for the dates within the range and for NaT.
+        """
+
+        self._track_order(dates.dropna())
+
+        keep: pd.Series = pd.Series(True, index=dates.index)
+        if self.since is not None:
+            keep &= dates >= self.since
+        if self.until is not None:
+            keep &= dates <= self.until
+        keep |= dates.isna()
+
+        if self._passed_range():
+            self.finished = True
+            logger.info(
+                "Transactions are sorted by date and past the requested range; "
+                f"stopped reading at {line_description(dates.index[-1])}"
+            )
+
+        return keep
+
+    def _track_order(self, dates: pd.Series) -> None:
+        """Update whether the dates seen so far, across chunks, are ascending and/or descending."""
+
+        if dates.empty:
+            return None
+
+        if self._first is None:
+            self._first = dates.iloc[0]
+        if self._last is not None:
+            self._ascending &= bool(dates.iloc[0] >= self._last)
+            self._descending &= bool(dates.iloc[0] <= self._last)
+        self._ascending &= dates.is_monotonic_increasing
+        self._descending &= dates.is_monotonic_decreasing
+        self._last = dates.iloc[-1]
+
+        return None
+
+    def _passed_range(self) -> bool:
+        """Return True if the file is sorted and its latest date is beyond the range."""
+
+        # The direction is only known once the dates have moved, so equal dates never stop reading
+        if self._first is None or self._last is None or self._first == self._last:
+            return False
+        if self._ascending and self._last > self._first and self.until is not None and self._last > self.until:
+            return True
+
+        return self._descending and self._last < self._first and self.since is not None and self._last < self.since
@@ -0,0 +1,34 @@
+"""
+Exceptions raised by the ynab_format_csv library.
+
+Library functions never print or exit; they raise one of these instead, and the
+command line interface decides how to report them.
+"""
+
+
+class YnabFormatError(Exception):
+    """Base class for all errors raised by ynab_format_csv."""
+
+
+class TransactionFileError(YnabFormatError):
+    """A transaction CSV file could not be read or written."""
+
+
+class MappingFileError(YnabFormatError):
+    """A field mapping YAML file could not be read, parsed or written."""
+
+
+class MappingError(YnabFormatError):
+    """A field mapping does not match the structure of the transaction file."""
+
+
+class HistoryStoreError(YnabFormatError):
+    """The Parquet transaction history store could not be read or written."""
+
+
+class RateTableError(YnabFormatError):
+    """An FX rate table could not be read or parsed."""
+
+
+class UploadError(YnabFormatError):
+    """Transactions could not be uploaded to the YNAB API."""
@@ -1,11 +1,18 @@
+import re
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
 from pathlib import Path
-from sys import exit
+from typing import IO, Self
 
-import click
+import numpy as np
 import pandas as pd
 import yaml
 
 from ynab_format_csv.dataclasses import FieldMapping
+from ynab_format_csv.exceptions import MappingFileError, TransactionFileError
+
+# Number of CSV rows read into memory at a time when streaming a transaction file
+DEFAULT_CHUNKSIZE: int = 100_000
 
 
 def write_field_mappings_to_yaml(field_mappings: list[FieldMapping], file_path: Path) -> None:
@@ -21,6 +28,11 @@ def write_field_mappings_to_yaml(field_mappings: list[FieldMapping], file_path:
     Returns
     -------
     None
+
+    Raises
+    ------
+    MappingFileError
+        If the YAML file cannot be written.
     """
 
     # Convert FieldMapping instances to dictionaries
@@ -31,13 +43,7 @@ def write_field_mappings_to_yaml(field_mappings: list[FieldMapping], file_path:
         with Path.open(file_path, "w") as file:
             yaml.safe_dump(mappings_dict, file)
     except OSError as e:
-        click.secho(f"Error writing to file: {file_path}. {e}", fg="red")
-        exit(1)
-    except Exception as e:
-        click.secho(f"An unexpected error occurred: {e}", fg="red")
-        exit(1)
-
-    print(f"Field mappings written to {file_path}")
+        raise MappingFileError(f"Error writing to file: {file_path}. {e}") from e
 
     return None
 
@@ -55,34 +61,34 @@ def read_field_mappings_from_yaml(file_path: Path) -> list[FieldMapping]:
     -------
     list of FieldMapping
         The list of FieldMapping instances read from the YAML file.
-    """
 
-    mappings_dict: list[dict] = []
-    field_mappings: list[FieldMapping] = []
+    Raises
+    ------
+    MappingFileError
+        If the file cannot be read, is not valid YAML, or does not contain a list of field mappings.
+    """
 
     try:
         # Read the YAML file into a list of dictionaries
         with Path.open(file_path, "r") as file:
-            mappings_dict = yaml.safe_load(file)
+            mappings_dict: list[dict] = yaml.safe_load(file)
     except yaml.YAMLError as e:
-        click.secho(f"Error parsing YAML file: {e}", fg="red")
-        click.echo(f'Perhaps the file "{file_path}" is not a valid YAML file?')
-        click.echo()
-    except Exception as e:
-        click.secho(f"An unexpected error occurred: {e}", fg="red")
+        raise MappingFileError(
+            f'Error parsing YAML file: {e}. Perhaps the file "{file_path}" is not valid YAML?'
+        ) from e
+    except OSError as e:
+        raise MappingFileError(f"Error reading file: {file_path}. {e}") from e
 
     # Convert the dictionaries to FieldMapping instances
     try:
-        field_mappings = [FieldMapping(**mapping) for mapping in mappings_dict]
+        field_mappings: list[FieldMapping] = [FieldMapping(**mapping) for mapping in mappings_dict]
     except TypeError as e:
-        click.secho(f"Error reading mapping file: {e}", fg="red")
-        click.echo(f"Perhaps the saved mapping file {file_path} is corrupt?")
-        click.echo()
+        raise MappingFileError(f"Error reading mapping file: {e}. Perhaps {file_path} is corrupt?") from e
 
     return field_mappings
 
 
-def read_csv_transaction_file(file_path: Path) -> pd.DataFrame:
+def read_csv_transaction_file(file_path: Path, nrows: int | None = None) -> pd.DataFrame:
     """
     Read the CSV transaction file and return a DataFrame.
 
@@ -90,6 +96,8 @@ def read_csv_transaction_file(file_path: Path) -> pd.DataFrame:
     ----------
     file_path : Path
         The path to the CSV file to be read.
+    nrows : int, optional
+        The number of rows to read from the start of the file, by default all rows.
 
     Returns
     -------
@@ -98,20 +106,173 @@ def read_csv_transaction_file(file_path: Path) -> pd.DataFrame:
 
     Raises
     ------
-    IOError
-        If there is an error reading the file.
+    TransactionFileError
+        If the file cannot be read, is not UTF-8 text, or is not a valid CSV file.
     """
 
     try:
-        df: pd.DataFrame = pd.read_csv(file_path)
-    except OSError:
-        click.secho(f"Error reading file: {file_path}", fg="red")
-        exit(1)
+        df: pd.DataFrame = pd.read_csv(file_path, nrows=nrows)
+    except OSError as e:
+        raise TransactionFileError(f"Error reading file: {file_path}") from e
+    except UnicodeDecodeError as e:
+        raise TransactionFileError(f"Error decoding file: {file_path}. Is it a UTF-8 CSV file? {e}") from e
+    except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        raise TransactionFileError(f"Error parsing CSV file: {file_path}. {e}") from e
 
     return df
 
 
-def write_dataframe_to_csv_file(df: pd.DataFrame, output_dir: Path, file_path: Path) -> None:
+def iter_csv_transaction_file(
+    source: Path | str | IO,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read the CSV transaction file in chunks, without loading the whole file into memory.
+
+    Every field is read as a string, so values such as account numbers keep their leading zeros
+    and amounts are only interpreted once the rows are validated.
+
+    Parameters
+    ----------
+    source : Path | str | IO
+        The path to the CSV file, or an open file object.
+    chunksize : int, optional
+        The number of rows in each chunk, by default DEFAULT_CHUNKSIZE.
+    on_progress : Callable[[int, int], None], optional
+        If given, called after each chunk with the number of bytes consumed from the file so far
+        and the number of rows read so far. Bytes are reported as 0 for file objects that can't
+        report their position.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next chunk of rows, without blank lines or rows whose fields are all empty. The index
+        holds the line offset of each row: the number of lines between the header and the row, so
+        that a row's line in the file is its index + HEADER_LINES + 1.
+
+    Raises
+    ------
+    TransactionFileError
+        If the file cannot be read, is not UTF-8 text, or is not a valid CSV file.
+    """
+
+    try:
+        with ExitStack() as stack:
+            handle: IO = (
+                stack.enter_context(Path.open(Path(source), "rb")) if isinstance(source, str | Path) else source
+            )
+            # Blank lines are read as empty rows rather than skipped, so the lines of every row can be counted
+            reader = stack.enter_context(
+                pd.read_csv(
+                    handle,
+                    dtype=str,
+                    keep_default_na=False,
+                    na_values=[""],
+                    skip_blank_lines=False,
+                    chunksize=chunksize,
+                )
+            )
+
+            lines: int = 0
+            rows: int = 0
+            for chunk in reader:
+                spans: np.ndarray = line_spans(chunk)
+                chunk.index = pd.Index(lines + np.cumsum(spans) - spans)
+                lines += int(spans.sum())
+
+                # A blank line has every field empty, so only rows with an empty first field need checking
+                maybe_blank: pd.Series = chunk.iloc[:, 0].isna()
+                if maybe_blank.any():
+                    chunk = chunk.drop(index=chunk.index[maybe_blank][chunk.loc[maybe_blank].isna().all(axis=1)])
+
+                rows += len(chunk)
+                if on_progress is not None:
+                    on_progress(bytes_consumed(handle), rows)
+                if not chunk.empty:
+                    yield chunk
+    except OSError as e:
+        raise TransactionFileError(f"Error reading file: {source}") from e
+    except UnicodeDecodeError as e:
+        raise TransactionFileError(f"Error decoding file: {source}. Is it a UTF-8 CSV file? {e}") from e
+    except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        raise TransactionFileError(f"Error parsing CSV file: {source}. {e}") from e
+
+
+def line_spans(chunk: pd.DataFrame) -> np.ndarray:
+    """
+    Count the lines of the file taken up by each row of a chunk.
+
+    Parameters
+    ----------
+    chunk : pd.DataFrame
+        A chunk of rows read as strings, including blank lines.
+
+    Returns
+    -------
+    np.ndarray
+        The number of lines of each row: one, plus one for every line break within its quoted fields.
+    """
+
+    spans: np.ndarray = np.ones(len(chunk), dtype=int)
+    for column in chunk.columns:
+        # Line breaks within fields are rare, so look for one in the whole column before counting them
+        if "\n" in "".join(chunk[column].dropna().to_numpy()):
+            spans += chunk[column].str.count("\n").fillna(0).to_numpy(int)
+
+    return spans
+
+
+def bytes_consumed(handle: IO) -> int:
+    """
+    Return how far into the file the reader has got, in bytes.
+
+    The CSV parser reads ahead in blocks, so this runs slightly ahead of the rows returned,
+    but it is available before the total number of rows is known.
+
+    Parameters
+    ----------
+    handle : IO
+        The open file being read.
+
+    Returns
+    -------
+    int
+        The current position of the file, or 0 if it can't be determined.
+    """
+
+    try:
+        return handle.tell()
+    except (OSError, ValueError):
+        return 0
+
+
+def output_file_path(output_dir: Path | None, file_path: Path, suffix: str) -> Path:
+    """
+    Build the path of an output file from the input file name.
+
+    Parameters
+    ----------
+    output_dir : Path | None
+        The directory to save the file to. Defaults to the current working directory.
+    file_path : Path
+        The input file name (and optional path).
+    suffix : str
+        The extension replacing the input file's extension, e.g. ".ynab.csv".
+
+    Returns
+    -------
+    Path
+        The full path of the output file.
+    """
+
+    if not output_dir:
+        output_dir = Path.cwd()
+
+    return Path.joinpath(output_dir, Path(file_path).with_suffix(suffix).name)
+
+
+def write_dataframe_to_csv_file(df: pd.DataFrame, output_dir: Path, file_path: Path) -> Path:
     """
     Write the DataFrame to a CSV file.
 
@@ -126,7 +287,8 @@ def write_dataframe_to_csv_file(df: pd.DataFrame, output_dir: Path, file_path: P
 
     Returns
     -------
-    None
+    Path
+        The full path of the CSV file written.
     """
 
     if not output_dir:
@@ -134,7 +296,170 @@ def write_dataframe_to_csv_file(df: pd.DataFrame, output_dir: Path, file_path: P
 
     full_path: Path = Path.joinpath(output_dir, file_path.name)
     df.to_csv(full_path, float_format="%.2f", index=False)
-    print(f"Updated data written to {full_path}")
-    print()
 
-    return None
+    return full_path
+
+
+class CsvBatchWriter:
+    """
+    Append batches of rows to a CSV file as they are produced.
+
+    The file is only created when the first batch is written, so no empty files are left
+    behind when there is nothing to write. The header is taken from the first batch.
+
+    Attributes
+    ----------
+    file_path : Path
+        The path of the CSV file.
+    rows : int
+        The number of rows written so far.
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path: Path = file_path
+        self.rows: int = 0
+        self._file: IO | None = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append a batch of rows to the CSV file.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The rows to write.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        TransactionFileError
+            If the file cannot be written.
+        """
+
+        try:
+            if self._file is None:
+                self._file = Path.open(self.file_path, "w", newline="")
+                df.to_csv(self._file, float_format="%.2f", index=False)
+            else:
+                df.to_csv(self._file, float_format="%.2f", index=False, header=False)
+        except OSError as e:
+            raise TransactionFileError(f"Error writing to file: {self.file_path}. {e}") from e
+
+        self.rows += len(df)
+
+        return None
+
+    def close(self) -> None:
+        """Close the CSV file, if it was opened."""
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        return None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class SplitCsvWriter:
+    """
+    Partition batches of rows into one CSV file per value of a key column, in a single pass.
+
+    One CsvBatchWriter is kept open per key, so each batch is grouped once and every group is
+    appended to its file straight away; the input never has to be re-read for each key.
+    The key column itself is not written to the files.
+
+    Attributes
+    ----------
+    split_by : str
+        The name of the key column.
+    writers : dict[str, CsvBatchWriter]
+        The writer for each key seen so far.
+    rows : int
+        The number of rows written so far, across all files.
+    """
+
+    def __init__(self, output_dir: Path | None, file_path: Path, suffix: str, split_by: str) -> None:
+        self.split_by: str = split_by
+        self.writers: dict[str, CsvBatchWriter] = {}
+        self.rows: int = 0
+        self._output_dir: Path | None = output_dir
+        self._file_path: Path = Path(file_path)
+        self._suffix: str = suffix
+
+    def key_file_path(self, key: str) -> Path:
+        """
+        Build an unused output path for a key, e.g. "bank.0238.ynab.csv" for key "0238".
+
+        Parameters
+        ----------
+        key : str
+            The value of the key column.
+
+        Returns
+        -------
+        Path
+            The full path of the key's CSV file.
+        """
+
+        safe_key: str = re.sub(r"[^\w.-]+", "_", key).strip("._") or "blank"
+        used: set[Path] = {writer.file_path for writer in self.writers.values()}
+
+        # Different keys can sanitize to the same name (e.g. "a/b" and "a b"), so number any repeats
+        file_path: Path = output_file_path(self._output_dir, self._file_path, f".{safe_key}{self._suffix}")
+        counter: int = 1
+        while file_path in used:
+            counter += 1
+            file_path = output_file_path(self._output_dir, self._file_path, f".{safe_key}-{counter}{self._suffix}")
+
+        return file_path
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append each key's rows in the batch to that key's CSV file.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The rows to write, including the key column.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        TransactionFileError
+            If a file cannot be written.
+        """
+
+        keys: pd.Series = df[self.split_by].fillna("").astype(str)
+        for key, group in df.drop(columns=self.split_by).groupby(keys, sort=False):
+            if key not in self.writers:
+                self.writers[key] = CsvBatchWriter(self.key_file_path(key))
+            self.writers[key].write(group)
+
+        self.rows += len(df)
+
+        return None
+
+    def close(self) -> None:
+        """Close every open CSV file."""
+
+        for writer in self.writers.values():
+            writer.close()
+
+        return None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
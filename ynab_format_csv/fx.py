@@ -0,0 +1,401 @@
+"""
+Conversion of foreign-currency transactions using a local table of daily FX rates.
+
+The rate table is a CSV file with Date, Currency and Rate columns, where Rate is the number of
+units of the account's currency per one unit of Currency. Each transaction takes the latest rate
+on or before its date, found with a single as-of join (pandas.merge_asof) over the batch rather
+than a lookup per row.
+
+Amounts are converted in integer arithmetic: whole cents times the rate scaled to an integer,
+rounded half away from zero back to whole cents, so results are exact to the cent.
+
+Parsed rate tables are cached in memory for the life of the process, and on disk (keyed by the
+table's path, size and modification time) so later runs skip parsing it again.
+"""
+
+import hashlib
+import os
+from contextlib import suppress
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ynab_format_csv.exceptions import RateTableError
+from ynab_format_csv.validation import MISSING_FX_RATE, ValidationResult, parse_dates, quarantine_rows
+
+# The column mapped with FieldMapping(ynab_field="Currency", ...). It is used for conversion and
+# then dropped, as YNAB has no currency field.
+CURRENCY_FIELD: str = "Currency"
+
+# Rates are stored as integers in units of 1 / RATE_SCALE
+RATE_SCALE: int = 10**9
+
+AMOUNT_FIELDS: tuple[str, ...] = ("Amount", "Outflow", "Inflow")
+RATE_TABLE_COLUMNS: list[str] = ["Date", "Currency", "Rate"]
+
+
+def cache_dir() -> Path:
+    """
+    Return the directory used for on-disk caches, following the XDG base directory convention.
+
+    Returns
+    -------
+    Path
+        $XDG_CACHE_HOME/ynab-format-csv, or ~/.cache/ynab-format-csv.
+    """
+
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "ynab-format-csv"
+
+
+def scale_rate(rate: str) -> int:
+    """
+    Convert a decimal rate string into an integer number of 1 / RATE_SCALE units, without rounding error.
+
+    Parameters
+    ----------
+    rate : str
+        The rate as written in the rate table, e.g. "1.0825".
+
+    Returns
+    -------
+    int
+        The scaled rate, rounded half away from zero to the nearest unit.
+
+    Raises
+    ------
+    RateTableError
+        If the rate is not a positive number.
+    """
+
+    try:
+        value: Decimal = Decimal(str(rate).strip())
+    except InvalidOperation as e:
+        raise RateTableError(f"Invalid FX rate: {rate!r}") from e
+
+    if not value.is_finite() or value <= 0:
+        raise RateTableError(f"Invalid FX rate: {rate!r}")
+
+    return int((value * RATE_SCALE).to_integral_value(rounding="ROUND_HALF_UP"))
+
+
+def parse_rate_table(file_path: Path) -> pd.DataFrame:
+    """
+    Read and parse a rate table CSV file.
+
+    Parameters
+    ----------
+    file_path : Path
+        The path to the rate table.
+
+    Returns
+    -------
+    pd.DataFrame
+        The rates, with columns date (datetime64), currency (upper case) and rate (scaled int64),
+        sorted by date.
+
+    Raises
+    ------
+    RateTableError
+        If the file cannot be read, is missing a column, or has an invalid date or rate.
+    """
+
+    try:
+        raw: pd.DataFrame = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+    except (OSError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        raise RateTableError(f"Error reading FX rate table: {file_path}. {e}") from e
+
+    missing: list[str] = [column for column in RATE_TABLE_COLUMNS if column not in raw.columns]
+    if missing:
+        raise RateTableError(f"The FX rate table {file_path} is missing the column(s): {', '.join(missing)}")
+
+    dates: pd.Series = parse_dates(raw["Date"])
+    if dates.isna().any():
+        raise RateTableError(f"The FX rate table {file_path} has an invalid date: {raw['Date'][dates.isna()].iloc[0]}")
+
+    # The table holds one row per currency per day, so this is small compared to the transactions
+    rates: list[int] = [scale_rate(rate) for rate in raw["Rate"]]
+
+    table: pd.DataFrame = pd.DataFrame(
+        {
+            "date": dates.astype("datetime64[ns]"),
+            "currency": raw["Currency"].str.strip().str.upper(),
+            "rate": np.array(rates, dtype="int64"),
+        }
+    )
+
+    return table.sort_values("date", kind="mergesort", ignore_index=True)
+
+
+def read_cached_rate_table(cache_file: Path) -> pd.DataFrame | None:
+    """
+    Read a parsed rate table from the on-disk cache.
+
+    Parameters
+    ----------
+    cache_file : Path
+        The cache file.
+
+    Returns
+    -------
+    pd.DataFrame | None
+        The cached rate table, or None if there is no usable cache file.
+    """
+
+    try:
+        with np.load(cache_file, allow_pickle=False) as cached:
+            return pd.DataFrame(
+                {
+                    "date": cached["date"].view("datetime64[ns]"),
+                    "currency": cached["currency"].astype(object),
+                    "rate": cached["rate"],
+                }
+            )
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # A damaged cache file (e.g. truncated by a crash) is just a cache miss; it is replaced once parsed
+        logger.debug(f"Ignoring unreadable FX rate cache {cache_file}: {e}")
+        return None
+
+
+def write_cached_rate_table(table: pd.DataFrame, cache_file: Path) -> None:
+    """
+    Save a parsed rate table to the on-disk cache. Failures are logged and otherwise ignored.
+
+    The table is written to a temporary file that then replaces the cache file, so an interrupted
+    or concurrent write never leaves a partial cache file behind.
+
+    Parameters
+    ----------
+    table : pd.DataFrame
+        The parsed rate table.
+    cache_file : Path
+        The cache file.
+
+    Returns
+    -------
+    None
+    """
+
+    temp_file: Path | None = None
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(
+            dir=cache_file.parent, prefix=f"{cache_file.name}.", suffix=".tmp", delete=False
+        ) as file:
+            temp_file = Path(file.name)
+            np.savez(
+                file,
+                date=table["date"].to_numpy(dtype="datetime64[ns]").view("int64"),
+                currency=table["currency"].to_numpy(dtype=str),
+                rate=table["rate"].to_numpy(dtype="int64"),
+            )
+        temp_file.replace(cache_file)
+    except OSError as e:
+        logger.debug(f"Could not cache the FX rate table at {cache_file}: {e}")
+        if temp_file is not None:
+            temp_file.unlink(missing_ok=True)
+
+    return None
+
+
+@lru_cache(maxsize=8)
+def load_cached_rate_table(resolved_path: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    """
+    Load a rate table through the in-memory and on-disk caches.
+
+    The file's modification time and size are part of the cache key, so an edited table is
+    always parsed again. Only the latest version of each table is kept on disk.
+
+    Parameters
+    ----------
+    resolved_path : str
+        The absolute path to the rate table.
+    mtime_ns : int
+        The rate table's modification time, in nanoseconds.
+    size : int
+        The rate table's size, in bytes.
+
+    Returns
+    -------
+    pd.DataFrame
+        The parsed rate table.
+    """
+
+    path_key: str = hashlib.sha256(resolved_path.encode()).hexdigest()[:16]
+    version_key: str = hashlib.sha256(f"{mtime_ns}:{size}".encode()).hexdigest()[:16]
+    cache_file: Path = cache_dir() / f"fx-rates-{path_key}-{version_key}.npz"
+
+    table: pd.DataFrame | None = read_cached_rate_table(cache_file)
+    if table is None:
+        logger.debug(f"Parsing FX rate table {resolved_path}")
+        table = parse_rate_table(Path(resolved_path))
+        write_cached_rate_table(table, cache_file)
+
+        # Remove the caches of earlier versions of the same table
+        for stale_file in cache_file.parent.glob(f"fx-rates-{path_key}-*.npz"):
+            if stale_file != cache_file:
+                with suppress(OSError):
+                    stale_file.unlink()
+
+    return table
+
+
+def read_rate_table(file_path: Path) -> pd.DataFrame:
+    """
+    Read a rate table, using the cached copy if the file hasn't changed.
+
+    Parameters
+    ----------
+    file_path : Path
+        The path to the rate table CSV file.
+
+    Returns
+    -------
+    pd.DataFrame
+        The parsed rate table. It is shared with the cache, so it must not be modified.
+
+    Raises
+    ------
+    RateTableError
+        If the file cannot be read or parsed.
+    """
+
+    try:
+        stat: os.stat_result = Path(file_path).stat()
+    except OSError as e:
+        raise RateTableError(f"Error reading FX rate table: {file_path}. {e}") from e
+
+    return load_cached_rate_table(str(Path(file_path).resolve()), stat.st_mtime_ns, stat.st_size)
+
+
+def convert_cents(cents: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    """
+    Multiply whole cents by scaled rates, rounding half away from zero to whole cents.
+
+    Parameters
+    ----------
+    cents : np.ndarray
+        The amounts in cents, as int64.
+    rates : np.ndarray
+        The rates in units of 1 / RATE_SCALE, as int64.
+
+    Returns
+    -------
+    np.ndarray
+        The converted amounts in cents.
+    """
+
+    # Fall back to Python integers when the product could overflow int64
+    if cents.size and int(np.abs(cents).max()) * int(rates.max()) >= 2**63:
+        cents, rates = cents.astype(object), rates.astype(object)
+
+    product = cents * rates
+
+    return np.sign(product) * ((np.abs(product) + RATE_SCALE // 2) // RATE_SCALE)
+
+
+class CurrencyConverter:
+    """
+    Convert the amounts of foreign-currency transactions into the account's currency.
+
+    Attributes
+    ----------
+    rates : pd.DataFrame
+        The parsed rate table.
+    base_currency : str
+        The account's currency code. Transactions in this currency, or with no currency, are
+        left unchanged.
+    """
+
+    def __init__(self, rates: pd.DataFrame, base_currency: str) -> None:
+        self.rates: pd.DataFrame = rates
+        self.base_currency: str = base_currency.strip().upper()
+
+    @classmethod
+    def from_file(cls, file_path: Path, base_currency: str) -> "CurrencyConverter":
+        """
+        Create a converter from a rate table CSV file, using the cache where possible.
+
+        Parameters
+        ----------
+        file_path : Path
+            The path to the rate table.
+        base_currency : str
+            The account's currency code.
+
+        Returns
+        -------
+        CurrencyConverter
+            The converter.
+
+        Raises
+        ------
+        RateTableError
+            If the rate table cannot be read or parsed.
+        """
+
+        return cls(read_rate_table(file_path), base_currency)
+
+    def apply(self, result: ValidationResult) -> ValidationResult:
+        """
+        Convert the valid rows of a batch, quarantining rows with no rate for their currency and date.
+
+        Parameters
+        ----------
+        result : ValidationResult
+            The outcome of validating a batch, with a Currency column.
+
+        Returns
+        -------
+        ValidationResult
+            The result with converted amounts and without the Currency column in the valid rows.
+        """
+
+        df: pd.DataFrame = result.valid
+        if CURRENCY_FIELD not in df.columns:
+            return result
+
+        currency: pd.Series = df[CURRENCY_FIELD].fillna("").astype(str).str.strip().str.upper()
+        foreign: np.ndarray = (currency.ne("") & currency.ne(self.base_currency)).to_numpy()
+
+        # As-of join: each foreign row takes the latest rate on or before its date, for its currency
+        rows: pd.DataFrame = pd.DataFrame(
+            {
+                "date": parse_dates(df["Date"]).astype("datetime64[ns]"),
+                "currency": currency.astype(object),
+                "position": np.arange(len(df)),
+            }
+        ).loc[foreign]
+        joined: pd.DataFrame = pd.merge_asof(
+            rows.sort_values("date", kind="mergesort"),
+            self.rates,
+            on="date",
+            by="currency",
+            direction="backward",
+        )
+
+        rates: np.ndarray = np.full(len(df), RATE_SCALE, dtype="int64")
+        missing: np.ndarray = np.zeros(len(df), dtype=bool)
+        positions: np.ndarray = joined["position"].to_numpy()
+        missing[positions] = joined["rate"].isna().to_numpy()
+        rates[positions] = joined["rate"].fillna(0).to_numpy(dtype="int64")
+
+        result = quarantine_rows(result, pd.Series(missing, index=df.index), MISSING_FX_RATE)
+        rates = rates[~missing]
+        valid: pd.DataFrame = result.valid.drop(columns=CURRENCY_FIELD)
+
+        for column in AMOUNT_FIELDS:
+            if column not in valid.columns:
+                continue
+            amounts: pd.Series = valid[column].astype(float)
+            cents: np.ndarray = (amounts.fillna(0) * 100).round().to_numpy(dtype="int64")
+            converted: np.ndarray = convert_cents(cents, rates).astype(float) / 100
+            valid[column] = pd.Series(converted, index=valid.index).where(amounts.notna())
+
+        return ValidationResult(valid=valid, invalid=result.invalid, reasons=result.reasons)
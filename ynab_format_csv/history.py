@@ -0,0 +1,338 @@
+"""
+A columnar history of every converted transaction, stored as a Parquet dataset.
+
+Each conversion stores its rows as files named after the source they came from, partitioned by
+transaction month (hive-style "month=YYYY-MM" directories), so converting the same source again
+replaces its files instead of adding to them. Queries push their date range down to the
+partition directories and their payee and column selections down to the Parquet reader,
+so only the matching months and columns are read from disk.
+
+pyarrow is an optional dependency: install ynab-format-csv[parquet] to use this module.
+"""
+
+import hashlib
+import shutil
+from contextlib import suppress
+from datetime import date
+from pathlib import Path
+from typing import Self
+
+import pandas as pd
+
+from ynab_format_csv.exceptions import HistoryStoreError
+from ynab_format_csv.mapping import net_amount
+from ynab_format_csv.validation import parse_dates
+
+HISTORY_COLUMNS: list[str] = ["date", "payee", "memo", "amount", "account", "source"]
+PARTITION_COLUMN: str = "month"
+
+# Rows are staged here until a conversion succeeds; pyarrow skips paths starting with "."
+STAGING_DIR: str = ".staging"
+
+
+def import_pyarrow() -> tuple:
+    """
+    Import the pyarrow modules used by the history store.
+
+    Returns
+    -------
+    tuple
+        The pyarrow, pyarrow.compute and pyarrow.dataset modules.
+
+    Raises
+    ------
+    HistoryStoreError
+        If pyarrow is not installed.
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise HistoryStoreError(
+            "The Parquet history store requires pyarrow. Install it with: pip install 'ynab-format-csv[parquet]'"
+        ) from e
+
+    return pa, pc, ds
+
+
+def normalize_transactions(df: pd.DataFrame, source: str, account: str | pd.Series = "") -> pd.DataFrame:
+    """
+    Convert validated YNAB rows into the normalized history layout.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Validated transaction data, with the YNAB field names as columns.
+    source : str
+        The name of the file the transactions were converted from.
+    account : str | pd.Series, optional
+        The account the transactions belong to, either one for every row or one per row,
+        by default empty.
+
+    Returns
+    -------
+    pd.DataFrame
+        The transactions with the HISTORY_COLUMNS, plus the month partition column.
+    """
+
+    dates: pd.Series = parse_dates(df["Date"])
+    empty: pd.Series = pd.Series(pd.NA, index=df.index, dtype="string")
+
+    return pd.DataFrame(
+        {
+            "date": dates.dt.date,
+            "payee": df["Payee"].astype("string") if "Payee" in df.columns else empty,
+            "memo": df["Memo"].astype("string") if "Memo" in df.columns else empty,
+            "amount": net_amount(df).round(2),
+            "account": account.astype("string") if isinstance(account, pd.Series) else account,
+            "source": source,
+            PARTITION_COLUMN: dates.dt.strftime("%Y-%m"),
+        },
+        index=df.index,
+    )
+
+
+def source_digest(files: list[Path]) -> str:
+    """
+    Hash the content of the files a conversion reads.
+
+    Parameters
+    ----------
+    files : list[Path]
+        The transaction files, in the order they are converted.
+
+    Returns
+    -------
+    str
+        The hex SHA-256 digest of the files' content.
+
+    Raises
+    ------
+    HistoryStoreError
+        If a file cannot be read.
+    """
+
+    digest = hashlib.sha256()
+    try:
+        for file_path in files:
+            with Path.open(file_path, "rb") as file:
+                digest.update(hashlib.file_digest(file, "sha256").digest())
+    except OSError as e:
+        raise HistoryStoreError(f"Error reading file: {e}") from e
+
+    return digest.hexdigest()
+
+
+class HistoryWriter:
+    """
+    Add the transactions of one conversion to the Parquet history store, all or nothing.
+
+    Batches are written to a staging directory inside the store as they arrive. Only when the
+    conversion finishes without error are they moved into the month partitions, replacing the
+    rows an earlier conversion of the same source stored; if it fails, they are discarded.
+    A source is identified by its name and the hash of its content, so converting the same file
+    again replaces its rows instead of storing them twice. Use it as a context manager.
+
+    Attributes
+    ----------
+    store_dir : Path
+        The root directory of the history store. It is created if it doesn't exist.
+    source : str
+        The name of the file the transactions were converted from.
+    key : str
+        The identifier of the source, used to name its Parquet files.
+    rows : int
+        The number of rows written so far.
+    """
+
+    def __init__(self, store_dir: Path, source: str, digest: str) -> None:
+        import_pyarrow()
+
+        self.store_dir: Path = Path(store_dir)
+        self.source: str = source
+        self.key: str = hashlib.sha256(f"{source}:{digest}".encode()).hexdigest()[:32]
+        self.rows: int = 0
+        self._staging_dir: Path = self.store_dir / STAGING_DIR / self.key
+        self._batches: int = 0
+
+    def write(self, df: pd.DataFrame, account: str | pd.Series = "") -> None:
+        """
+        Stage a batch of converted transactions.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Validated transaction data, with the YNAB field names as columns.
+        account : str | pd.Series, optional
+            The account the transactions belong to, either one for every row or one per row,
+            by default empty.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        HistoryStoreError
+            If the batch cannot be written.
+        """
+
+        pa, _, ds = import_pyarrow()
+
+        if df.empty:
+            return None
+
+        history: pd.DataFrame = normalize_transactions(df, self.source, account)
+        schema = pa.schema(
+            [
+                ("date", pa.date32()),
+                ("payee", pa.string()),
+                ("memo", pa.string()),
+                ("amount", pa.float64()),
+                ("account", pa.string()),
+                ("source", pa.string()),
+                (PARTITION_COLUMN, pa.string()),
+            ]
+        )
+        table = pa.Table.from_pandas(history, schema=schema, preserve_index=False)
+
+        try:
+            ds.write_dataset(
+                table,
+                self._staging_dir,
+                format="parquet",
+                partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive"),
+                basename_template=f"{self.key}-{self._batches}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+        except (OSError, pa.ArrowException) as e:
+            raise HistoryStoreError(f"Error writing to history store: {self.store_dir}. {e}") from e
+
+        self._batches += 1
+        self.rows += len(history)
+
+        return None
+
+    def commit(self) -> None:
+        """
+        Replace the source's rows in the store with the staged ones.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        HistoryStoreError
+            If the store cannot be updated.
+        """
+
+        try:
+            for old_file in self.store_dir.glob(f"{PARTITION_COLUMN}=*/{self.key}-*.parquet"):
+                old_file.unlink()
+            for new_file in self._staging_dir.glob(f"{PARTITION_COLUMN}=*/*.parquet"):
+                partition_dir: Path = self.store_dir / new_file.parent.name
+                partition_dir.mkdir(parents=True, exist_ok=True)
+                new_file.replace(partition_dir / new_file.name)
+        except OSError as e:
+            raise HistoryStoreError(f"Error writing to history store: {self.store_dir}. {e}") from e
+        finally:
+            self.discard()
+
+        return None
+
+    def discard(self) -> None:
+        """Delete the staged rows."""
+
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
+        # Other conversions may still be staging rows of their own
+        with suppress(OSError):
+            self._staging_dir.parent.rmdir()
+
+        return None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+
+def query_history(
+    store_dir: Path,
+    payee: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Read matching transactions from the Parquet history store.
+
+    Parameters
+    ----------
+    store_dir : Path
+        The root directory of the history store.
+    payee : str, optional
+        Only return transactions whose payee contains this text (case-insensitive).
+    since : date, optional
+        Only return transactions on or after this date.
+    until : date, optional
+        Only return transactions on or before this date.
+    columns : list[str], optional
+        The columns to return, by default all of HISTORY_COLUMNS.
+
+    Returns
+    -------
+    pd.DataFrame
+        The matching transactions, sorted by date.
+
+    Raises
+    ------
+    HistoryStoreError
+        If pyarrow is not installed, the store doesn't exist, or an unknown column is requested.
+    """
+
+    pa, pc, ds = import_pyarrow()
+
+    if not Path(store_dir).is_dir():
+        raise HistoryStoreError(f"History store not found: {store_dir}")
+
+    columns = columns or HISTORY_COLUMNS
+    unknown: list[str] = [column for column in columns if column not in HISTORY_COLUMNS]
+    if unknown:
+        raise HistoryStoreError(f"Unknown history column(s): {', '.join(unknown)}")
+
+    dataset = ds.dataset(
+        store_dir,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive"),
+    )
+
+    # The month predicates prune whole partition directories; the date predicates filter within them
+    predicates: list = []
+    if since:
+        predicates += [ds.field(PARTITION_COLUMN) >= since.strftime("%Y-%m"), ds.field("date") >= since]
+    if until:
+        predicates += [ds.field(PARTITION_COLUMN) <= until.strftime("%Y-%m"), ds.field("date") <= until]
+    if payee:
+        predicates.append(pc.match_substring(ds.field("payee"), payee, ignore_case=True))
+
+    expression = None
+    for predicate in predicates:
+        expression = predicate if expression is None else expression & predicate
+
+    try:
+        table = dataset.to_table(columns=columns, filter=expression)
+    except (OSError, pa.ArrowException) as e:
+        raise HistoryStoreError(f"Error reading history store: {store_dir}. {e}") from e
+
+    df: pd.DataFrame = table.to_pandas()
+    if "date" in df.columns:
+        df = df.sort_values("date", kind="mergesort", ignore_index=True)
+
+    return df
@@ -0,0 +1,246 @@
+from string import Formatter
+
+import pandas as pd
+
+from ynab_format_csv.dataclasses import FieldMapping
+from ynab_format_csv.exceptions import MappingError
+
+
+def generate_ynab_header_fields() -> list[FieldMapping]:
+    """
+    Generate and return the list of YNAB header fields.
+
+    Available fields taken from YNAB documentation:
+    https://support.ynab.com/en_us/formatting-a-csv-file-an-overview-BJvczkuRq#texteditor
+
+    Returns
+    -------
+    list[FieldMapping]
+        A list of FieldMapping objects representing the YNAB header fields with the following fields:
+        - Date
+        - Payee
+        - Memo
+        - Amount (single field for both inflow and outflow)
+        - Outflow (used if separate fields)
+        - Inflow (used if separate fields)
+    """
+
+    return [
+        FieldMapping(ynab_field="Date"),
+        FieldMapping(ynab_field="Payee"),
+        FieldMapping(ynab_field="Memo"),
+        FieldMapping(ynab_field="Amount", note="A single field for both inflow and outflow"),
+        FieldMapping(ynab_field="Outflow", note="Used if separate fields are used for inflow and outflow"),
+        FieldMapping(ynab_field="Inflow", note="Used if separate fields are used for inflow and outflow"),
+    ]
+
+
+def is_mapped(field: FieldMapping) -> bool:
+    """
+    Return True if the YNAB field has been mapped to a CSV field.
+
+    Parameters
+    ----------
+    field : FieldMapping
+        The field mapping to check.
+
+    Returns
+    -------
+    bool
+        True if the field has a template, or a CSV field that wasn't left empty or skipped.
+    """
+
+    return bool(field.template) or (bool(field.csv_field) and field.csv_field.lower() != "skipped")
+
+
+def parse_template(template: str) -> list[tuple[str, str | None]]:
+    """
+    Split a field template into its literal text and the CSV fields it refers to.
+
+    Parameters
+    ----------
+    template : str
+        The template, e.g. "{Category} / {Transaction Type}". Use "{{" and "}}" for literal braces.
+
+    Returns
+    -------
+    list[tuple[str, str | None]]
+        (literal text, CSV field name) pairs, in order. The field name is None for trailing text.
+
+    Raises
+    ------
+    MappingError
+        If the template is malformed, or uses format specs or conversions, which aren't supported.
+    """
+
+    try:
+        parts: list = list(Formatter().parse(template))
+    except ValueError as e:
+        raise MappingError(f"Invalid template {template!r}: {e}") from e
+
+    for _, field_name, format_spec, conversion in parts:
+        if field_name == "":
+            raise MappingError(f"Invalid template {template!r}: empty field name")
+        if format_spec or conversion:
+            raise MappingError(f"Invalid template {template!r}: format specs and conversions are not supported")
+
+    return [(literal, field_name) for literal, field_name, _, _ in parts]
+
+
+def source_fields(field: FieldMapping) -> list[str]:
+    """
+    Return the CSV fields a mapped YNAB field is built from.
+
+    Parameters
+    ----------
+    field : FieldMapping
+        A mapped field.
+
+    Returns
+    -------
+    list[str]
+        The CSV fields named in the field's template, or its single CSV field.
+    """
+
+    if field.template:
+        return [name for _, name in parse_template(field.template) if name is not None]
+
+    return [field.csv_field]
+
+
+def render_template(df: pd.DataFrame, template: str) -> pd.Series:
+    """
+    Build a column from a template by concatenating whole columns, rather than formatting row by row.
+
+    Blank values are left out together with the text that joins them to the rest: text between two
+    fields is kept only where both a field before it and the field after it are non-blank, and text
+    before the first field or after the last only where that field is non-blank. For example,
+    "{Category} / {Transaction Type}" renders "Food / Debit", "Food" or "Debit". The result is
+    stripped of surrounding whitespace.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The CSV transaction data, with the original CSV field names.
+    template : str
+        The template, e.g. "{Category} / {Transaction Type}".
+
+    Returns
+    -------
+    pd.Series
+        The rendered column.
+    """
+
+    rendered: pd.Series = pd.Series("", index=df.index, dtype=object)
+    # Where a non-blank value has been rendered so far, and where the latest field is non-blank
+    seen: pd.Series | None = None
+    present: pd.Series = pd.Series(True, index=df.index)
+
+    for literal, field_name in parse_template(template):
+        if field_name is None:
+            # Trailing text follows the last field, so goes with it
+            rendered = rendered + pd.Series(literal, index=df.index).where(present, "")
+            continue
+
+        value: pd.Series = df[field_name].fillna("").astype(str)
+        present = value.str.strip().ne("")
+        if literal:
+            keep: pd.Series = present if seen is None else present & seen
+            rendered = rendered + pd.Series(literal, index=df.index).where(keep, "")
+        rendered = rendered + value
+        seen = present if seen is None else seen | present
+
+    return rendered.str.strip()
+
+
+def filter_dataframe(df: pd.DataFrame, field_mapping: list[FieldMapping]) -> pd.DataFrame:
+    """
+    Filter and rename the transaction entries based on the field mapping.
+
+    Fields with a template are built by concatenating the CSV columns the template names.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The CSV transaction data as a DataFrame.
+    field_mapping : list[FieldMapping]
+        A list of FieldMapping objects that define the mapping between CSV fields and YNAB fields.
+
+    Returns
+    -------
+    pd.DataFrame
+        The filtered and renamed CSV transaction data as a DataFrame.
+
+    Raises
+    ------
+    MappingError
+        If the mapping refers to CSV fields that are not in the transaction file, or has an invalid template.
+    """
+
+    mapped_fields: list[FieldMapping] = [field for field in field_mapping if is_mapped(field)]
+
+    missing: list[str] = list(
+        dict.fromkeys(name for field in mapped_fields for name in source_fields(field) if name not in df.columns)
+    )
+    if missing:
+        raise MappingError(f"The transaction file does not contain the mapped field(s): {', '.join(missing)}")
+
+    # Build the output from the original columns, so unmapped columns that share a YNAB field
+    # name (e.g. an unused "Date" column) can't collide with the mapped ones
+    modified_df: pd.DataFrame = pd.DataFrame(
+        {
+            field.ynab_field: render_template(df, field.template) if field.template else df[field.csv_field]
+            for field in mapped_fields
+        },
+        index=df.index,
+    )
+
+    return modified_df
+
+
+def net_amount(df: pd.DataFrame) -> pd.Series:
+    """
+    Return the signed amount of each transaction, positive for inflows and negative for outflows.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Validated transaction data, using either the single Amount field or separate
+        Outflow and Inflow fields.
+
+    Returns
+    -------
+    pd.Series
+        The signed amount of each row. Missing amounts are treated as zero.
+    """
+
+    if "Amount" in df.columns:
+        return df["Amount"].astype(float).fillna(0)
+
+    amount: pd.Series = pd.Series(0.0, index=df.index)
+    if "Inflow" in df.columns:
+        amount += df["Inflow"].astype(float).fillna(0)
+    if "Outflow" in df.columns:
+        amount -= df["Outflow"].astype(float).fillna(0)
+
+    return amount
+
+
+def amount_in_cents(df: pd.DataFrame) -> pd.Series:
+    """
+    Return the signed amount of each transaction as a whole number of cents.
+
+    Integer cents compare exactly, unlike the floating point amounts they are derived from.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Validated transaction data.
+
+    Returns
+    -------
+    pd.Series
+        The signed amount of each row in cents, as int64.
+    """
+
+    return (net_amount(df) * 100).round().astype("int64")
@@ -0,0 +1,191 @@
+"""
+Merge the transactions of several exports into a single stream ordered by date.
+
+This is an external merge sort. Each validated batch is sorted by date and spilled to a
+temporary "run" file, so no more than one batch is held in memory while the inputs are read.
+The runs are then merged with a streaming k-way merge that reads each run a slice at a time,
+so memory stays bounded by the chunk size rather than the combined size of the files.
+
+The merge works a block at a time rather than a row at a time: every row in the buffered
+slices that is no later than the earliest slice's last row can safely be emitted, so each
+step is one vectorized stable sort of the rows that are ready.
+
+The merge is stable: transactions on the same date keep the order of the input files, and of
+the rows within each file. The index of every row is stored in the run files alongside it, so
+rows can still be traced back to their input file and line once merged.
+"""
+
+from collections.abc import Iterator
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+
+from ynab_format_csv.fx import AMOUNT_FIELDS
+from ynab_format_csv.validation import parse_dates
+
+# The sort key is stored as the first column of every run file
+SORT_KEY_COLUMN: str = "__sort_key__"
+
+# Followed by the levels of the index, the last of which is the row's line offset in its input file
+INDEX_COLUMN_PREFIX: str = "__index_"
+
+# The fewest rows read from a run at a time, however many runs there are
+MIN_RUN_SLICE: int = 100
+
+
+def write_sorted_run(df: pd.DataFrame, file_path: Path) -> None:
+    """
+    Sort a batch by date and write it to a run file, with its sort key and index as the first columns.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        A batch of validated transaction data.
+    file_path : Path
+        The run file to write.
+
+    Returns
+    -------
+    None
+    """
+
+    keys: pd.Series = parse_dates(df["Date"]).astype("datetime64[ns]").astype("int64")
+    index_columns: list[str] = [f"{INDEX_COLUMN_PREFIX}{level}__" for level in range(df.index.nlevels)]
+    run: pd.DataFrame = df.reset_index(names=index_columns).assign(**{SORT_KEY_COLUMN: keys.to_numpy()})
+    run = run[[SORT_KEY_COLUMN, *index_columns, *df.columns]].sort_values(SORT_KEY_COLUMN, kind="mergesort")
+    run.to_csv(file_path, index=False)
+
+    return None
+
+
+def iter_run_slices(file_path: Path, slice_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read a run file lazily, a slice at a time.
+
+    Parameters
+    ----------
+    file_path : Path
+        The run file.
+    slice_size : int
+        The number of rows read at a time.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next slice of the run, with int64 sort key and line offset columns and float amount columns.
+    """
+
+    for chunk in pd.read_csv(file_path, dtype=str, keep_default_na=False, na_values=[""], chunksize=slice_size):
+        index_columns: list[str] = [column for column in chunk.columns if column.startswith(INDEX_COLUMN_PREFIX)]
+        chunk[SORT_KEY_COLUMN] = chunk[SORT_KEY_COLUMN].astype("int64")
+        chunk[index_columns[-1]] = chunk[index_columns[-1]].astype("int64")
+        for column in AMOUNT_FIELDS:
+            if column in chunk.columns:
+                chunk[column] = chunk[column].astype(float)
+        yield chunk
+
+
+def merge_runs(runs: list[Iterator[pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+    """
+    Merge sorted runs into blocks of rows in sort key order, holding one slice of each run at a time.
+
+    Parameters
+    ----------
+    runs : list[Iterator[pd.DataFrame]]
+        The slices of each run, each run sorted by SORT_KEY_COLUMN, in input order.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next block of merged rows. Rows with equal keys are in run order.
+    """
+
+    # The buffered slice and its sort keys of each run that still has rows, by position in runs
+    buffers: dict[int, pd.DataFrame] = {}
+    keys: dict[int, np.ndarray] = {}
+    for i, run in enumerate(runs):
+        buffer: pd.DataFrame | None = next(run, None)
+        if buffer is not None:
+            buffers[i], keys[i] = buffer, buffer[SORT_KEY_COLUMN].to_numpy()
+
+    while buffers:
+        live: list[int] = sorted(buffers)
+
+        # No row still to be read from a run sorts before the last row of its buffer, so every
+        # buffered row up to the smallest of those last keys is ready to be emitted
+        last_keys: np.ndarray = np.array([keys[i][-1] for i in live])
+        cutoff: np.int64 = last_keys.min()
+        first: int = live[int(last_keys.argmin())]
+
+        ready: list[pd.DataFrame] = []
+        for i in live:
+            # Rows equal to the cutoff in later runs wait, as the first run may have more of them
+            end: int = int(np.searchsorted(keys[i], cutoff, side="right" if i <= first else "left"))
+            if end == 0:
+                continue
+            if end < len(keys[i]):
+                ready.append(buffers[i].iloc[:end])
+                buffers[i], keys[i] = buffers[i].iloc[end:], keys[i][end:]
+                continue
+
+            ready.append(buffers[i])
+            buffer = next(runs[i], None)
+            if buffer is None:
+                del buffers[i], keys[i]
+            else:
+                buffers[i], keys[i] = buffer, buffer[SORT_KEY_COLUMN].to_numpy()
+
+        yield pd.concat(ready).sort_values(SORT_KEY_COLUMN, kind="mergesort")
+
+
+def merge_by_date(batches: Iterator[pd.DataFrame], chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Merge batches of validated transactions into batches ordered by date.
+
+    Parameters
+    ----------
+    batches : Iterator[pd.DataFrame]
+        Batches of validated transaction data with the same columns, in input order. Each is indexed
+        by line offset in its input file, optionally preceded by further levels such as the file name.
+    chunksize : int
+        The approximate number of rows in each merged batch. No more than about twice this many
+        rows are held in memory while the runs are merged.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next batch of transactions in date order, with the index each row had in its batch.
+    """
+
+    with TemporaryDirectory(prefix="ynab-format-csv-") as run_dir:
+        runs: list[Path] = []
+        columns: list[str] = []
+        index_names: list = []
+        for batch in batches:
+            columns = columns or batch.columns.tolist()
+            index_names = index_names or list(batch.index.names)
+            runs.append(Path(run_dir) / f"run-{len(runs):06d}.csv")
+            write_sorted_run(batch[columns], runs[-1])
+
+        slice_size: int = max(MIN_RUN_SLICE, chunksize // max(len(runs), 1))
+        index_columns: list[str] = [f"{INDEX_COLUMN_PREFIX}{level}__" for level in range(len(index_names))]
+        pending: list[pd.DataFrame] = []
+        pending_rows: int = 0
+
+        for block in merge_runs([iter_run_slices(run, slice_size) for run in runs]):
+            pending.append(block)
+            pending_rows += len(block)
+            if pending_rows < chunksize:
+                continue
+
+            merged: pd.DataFrame = pd.concat(pending).drop(columns=SORT_KEY_COLUMN).set_index(index_columns)
+            merged.index.names = index_names
+            pending, pending_rows = [], 0
+            yield merged
+
+        if pending:
+            merged = pd.concat(pending).drop(columns=SORT_KEY_COLUMN).set_index(index_columns)
+            merged.index.names = index_names
+            yield merged
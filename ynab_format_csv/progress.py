@@ -0,0 +1,78 @@
+"""
+Live progress reporting for long conversions.
+
+Progress is measured in bytes consumed from the input file, so the bar, throughput and ETA
+are meaningful from the first chunk onwards, long before the total number of rows is known.
+"""
+
+from rich.console import Console
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    Progress,
+    ProgressColumn,
+    Task,
+    TextColumn,
+    TimeRemainingColumn,
+    TransferSpeedColumn,
+)
+from rich.text import Text
+
+
+class RowsPerSecondColumn(ProgressColumn):
+    """Render the number of rows converted per second, from the task's `rows` field."""
+
+    def render(self, task: Task) -> Text:
+        """
+        Render the row throughput of the task.
+
+        Parameters
+        ----------
+        task : Task
+            The progress task, with the rows read so far in `task.fields["rows"]`.
+
+        Returns
+        -------
+        Text
+            The rows per second, or "?" before any time has elapsed.
+        """
+
+        rows: int = task.fields.get("rows", 0)
+        # Stop the clock once the whole file has been read, so the rate doesn't decay afterwards
+        elapsed: float | None = task.finished_time if task.finished else task.elapsed
+        if not elapsed:
+            return Text("? rows/s", style="progress.data.speed")
+
+        return Text(f"{rows / elapsed:,.0f} rows/s", style="progress.data.speed")
+
+
+def conversion_progress(console: Console | None = None) -> Progress:
+    """
+    Create a progress display for a conversion, showing bytes, rows/s, MB/s and ETA.
+
+    The display is written to stderr and switches itself off when stderr is not a terminal,
+    so redirected or piped runs are not cluttered with progress output.
+
+    Parameters
+    ----------
+    console : Console, optional
+        The console to render to, by default a new console on stderr.
+
+    Returns
+    -------
+    Progress
+        The progress display. Use it as a context manager, and add one task per input file.
+    """
+
+    console = console or Console(stderr=True)
+
+    return Progress(
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        DownloadColumn(),
+        TransferSpeedColumn(),
+        RowsPerSecondColumn(),
+        TimeRemainingColumn(),
+        console=console,
+        disable=not console.is_terminal,
+    )
@@ -0,0 +1,247 @@
+"""
+Match transfers between accounts converted together.
+
+A transfer shows up in two exports: an outflow from one account and an inflow of the same
+amount into another, usually a day or two apart. Candidates are found with sorted as-of joins
+(pandas.merge_asof) by amount, each outflow taking the nearest-dated inflow in each other
+account, rather than by comparing every outflow with every inflow. Rows of an account with the
+same amount and date are joined once, as a group, and the joins are repeated on the groups left
+unmatched until no new pair is found. Each round is O(n log n) and uses up at least one group;
+only groups competing for the same match need another round, so there are usually only a few.
+
+Matched rows have their Payee set to YNAB's transfer format, "Transfer : <account name>",
+so YNAB links the two sides when the files are imported.
+"""
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ynab_format_csv.mapping import amount_in_cents
+from ynab_format_csv.validation import line_description, parse_dates
+
+TRANSFER_PAYEE_PREFIX: str = "Transfer : "
+
+
+def transfer_keys(accounts: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Build the join keys for the transactions of every account.
+
+    Parameters
+    ----------
+    accounts : dict[str, pd.DataFrame]
+        Validated transaction data for each account, keyed by account name.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per dated, non-zero transaction, with its account, index label, date, signed
+        cents and absolute cents.
+    """
+
+    frames: list[pd.DataFrame] = [
+        pd.DataFrame(
+            {
+                "account": name,
+                "label": df.index,
+                "date": parse_dates(df["Date"]).astype("datetime64[ns]").to_numpy(),
+                "cents": amount_in_cents(df).to_numpy(),
+            }
+        )
+        for name, df in accounts.items()
+        if not df.empty and "Date" in df.columns
+    ]
+    if not frames:
+        return pd.DataFrame(columns=["account", "label", "date", "cents", "size"])
+
+    keys: pd.DataFrame = pd.concat(frames, ignore_index=True)
+    keys = keys.loc[keys["date"].notna() & keys["cents"].ne(0)]
+
+    return keys.assign(size=keys["cents"].abs())
+
+
+def find_transfer_pairs(keys: pd.DataFrame, window_days: int) -> pd.DataFrame:
+    """
+    Pair outflows with equal and opposite inflows in other accounts, one to one.
+
+    Rows of one account with the same amount and date can't be told apart, so they are matched as
+    a group. Each round joins the unmatched outflow groups to the unmatched inflow groups of each
+    account in turn, taking the nearest-dated inflow group of the same size within the window.
+    Conflicts are settled in favour of the pairs closest in date, and each pair of groups matches
+    as many rows as both have left, in file order. Every round uses up at least one group, and
+    rounds stop when no pair is found, so repeated identical transfers cost no extra rounds.
+
+    Parameters
+    ----------
+    keys : pd.DataFrame
+        The join keys, as returned by transfer_keys().
+    window_days : int
+        The maximum number of days between the two sides of a transfer.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per transfer, with the outflow's account and label (out_account, out_label),
+        the inflow's (in_account, in_label), and the amount in cents (size).
+    """
+
+    tolerance: pd.Timedelta = pd.to_timedelta(window_days, unit="D")
+    keys = keys.reset_index(drop=True)
+    group_ids: pd.Series = keys.groupby(["account", "cents", "date"], sort=False).ngroup()
+    rows: pd.MultiIndex = pd.MultiIndex.from_arrays([group_ids, group_ids.groupby(group_ids).cumcount()])
+
+    # One row per group, holding the number of its rows still unmatched and the rank of the first of them
+    groups: pd.DataFrame = (
+        keys.groupby(group_ids)
+        .agg(account=("account", "first"), date=("date", "first"), cents=("cents", "first"), size=("size", "first"))
+        .assign(count=group_ids.value_counts(sort=False), used=0)
+        .sort_values("date", kind="mergesort")
+    )
+    outflows: pd.DataFrame = groups.loc[groups["cents"].lt(0)]
+    inflows: pd.DataFrame = groups.loc[groups["cents"].gt(0)]
+    matches: list[pd.DataFrame] = []
+
+    while not outflows.empty and not inflows.empty:
+        candidates: list[pd.DataFrame] = []
+        for account, account_inflows in inflows.groupby("account", sort=False):
+            joined: pd.DataFrame = pd.merge_asof(
+                outflows.loc[outflows["account"].ne(account)].reset_index(names="out_key"),
+                account_inflows[["date", "size"]].reset_index(names="in_key").assign(in_date=lambda df: df["date"]),
+                on="date",
+                by="size",
+                direction="nearest",
+                tolerance=tolerance,
+            )
+            joined = joined.dropna(subset=["in_key"])
+            if not joined.empty:
+                candidates.append(joined)
+
+        if not candidates:
+            break
+        matched: pd.DataFrame = pd.concat(candidates, ignore_index=True)
+
+        # Keep the closest outflow group for each inflow group, then the closest inflow group for each outflow group
+        matched = (
+            matched.assign(gap=(matched["date"] - matched["in_date"]).abs())
+            .sort_values(["gap", "out_key", "in_key"], kind="mergesort")
+            .drop_duplicates("in_key")
+            .drop_duplicates("out_key")
+        )
+        out_keys: pd.Index = pd.Index(matched["out_key"])
+        in_keys: pd.Index = pd.Index(matched["in_key"].astype("int64"))
+        count: np.ndarray = np.minimum(
+            outflows.loc[out_keys, "count"].to_numpy(), inflows.loc[in_keys, "count"].to_numpy()
+        )
+        matches.append(
+            pd.DataFrame(
+                {
+                    "out_key": out_keys,
+                    "out_used": outflows.loc[out_keys, "used"].to_numpy(),
+                    "in_key": in_keys,
+                    "in_used": inflows.loc[in_keys, "used"].to_numpy(),
+                    "count": count,
+                }
+            )
+        )
+
+        outflows = use_group_rows(outflows, out_keys, count)
+        inflows = use_group_rows(inflows, in_keys, count)
+
+    if not matches:
+        return pd.DataFrame(columns=["out_account", "out_label", "in_account", "in_label", "size"])
+
+    # Expand each pair of groups into its pairs of rows, taking the rows of each group in order
+    pairs: pd.DataFrame = pd.concat(matches, ignore_index=True)
+    repeats: np.ndarray = pairs["count"].to_numpy()
+    offsets: np.ndarray = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    out_rows: np.ndarray = rows.get_indexer(
+        pd.MultiIndex.from_arrays(
+            [np.repeat(pairs["out_key"], repeats), np.repeat(pairs["out_used"], repeats) + offsets]
+        )
+    )
+    in_rows: np.ndarray = rows.get_indexer(
+        pd.MultiIndex.from_arrays([np.repeat(pairs["in_key"], repeats), np.repeat(pairs["in_used"], repeats) + offsets])
+    )
+
+    return pd.DataFrame(
+        {
+            "out_account": keys["account"].to_numpy()[out_rows],
+            "out_label": keys["label"].to_numpy()[out_rows],
+            "in_account": keys["account"].to_numpy()[in_rows],
+            "in_label": keys["label"].to_numpy()[in_rows],
+            "size": keys["size"].to_numpy()[out_rows],
+        }
+    )
+
+
+def use_group_rows(groups: pd.DataFrame, group_keys: pd.Index, count: np.ndarray) -> pd.DataFrame:
+    """
+    Take matched rows out of their groups, dropping the groups with no rows left.
+
+    Parameters
+    ----------
+    groups : pd.DataFrame
+        The unmatched groups, with the number of rows left (count) and the rank of the first (used).
+    group_keys : pd.Index
+        The groups that were matched.
+    count : np.ndarray
+        The number of rows matched from each of them.
+
+    Returns
+    -------
+    pd.DataFrame
+        The groups with rows still unmatched.
+    """
+
+    groups = groups.copy()
+    groups.loc[group_keys, "count"] -= count
+    groups.loc[group_keys, "used"] += count
+
+    return groups.loc[groups["count"].gt(0)]
+
+
+def match_transfers(accounts: dict[str, pd.DataFrame], window_days: int) -> dict[str, pd.DataFrame]:
+    """
+    Find transfers between accounts and mark both sides with YNAB's transfer payee.
+
+    A transfer is an outflow from one account and an inflow of the same amount into a different
+    account, dated no more than `window_days` apart. Each row is matched at most once; when an
+    amount repeats, rows are paired with the nearest date first.
+
+    Parameters
+    ----------
+    accounts : dict[str, pd.DataFrame]
+        Validated transaction data for each account, keyed by the account name as it appears in YNAB.
+    window_days : int
+        The maximum number of days between the two sides of a transfer.
+
+    Returns
+    -------
+    dict[str, pd.DataFrame]
+        The transaction data for each account, with the Payee of every matched row set to
+        "Transfer : <other account name>". A Payee column is added to accounts without one.
+    """
+
+    pairs: pd.DataFrame = find_transfer_pairs(transfer_keys(accounts), window_days)
+
+    annotated: dict[str, pd.DataFrame] = {}
+    for name, df in accounts.items():
+        df = df.copy()
+        if "Payee" not in df.columns:
+            df["Payee"] = pd.Series(np.nan, index=df.index, dtype=object)
+        else:
+            df["Payee"] = df["Payee"].astype(object)
+
+        outgoing: pd.DataFrame = pairs.loc[pairs["out_account"].eq(name)]
+        incoming: pd.DataFrame = pairs.loc[pairs["in_account"].eq(name)]
+        df.loc[outgoing["out_label"], "Payee"] = (TRANSFER_PAYEE_PREFIX + outgoing["in_account"]).to_numpy()
+        df.loc[incoming["in_label"], "Payee"] = (TRANSFER_PAYEE_PREFIX + incoming["out_account"]).to_numpy()
+        annotated[name] = df
+
+    for pair in pairs.to_dict(orient="records"):
+        logger.info(
+            f"Matched transfer of {pair['size'] / 100:.2f} from {pair['out_account']} "
+            f"({line_description(pair['out_label'])}) to {pair['in_account']} ({line_description(pair['in_label'])})"
+        )
+
+    return annotated
@@ -0,0 +1,406 @@
+"""
+Upload converted transactions straight to the YNAB API.
+
+Transactions are posted to the bulk transactions endpoint in batches of at most `batch_size`,
+from a small pool of threads that share a pool of keep-alive HTTP connections. Requests that
+are rate limited (HTTP 429) or fail on the server side are retried with exponential backoff,
+honouring the Retry-After header when YNAB sends one.
+
+Every transaction carries an import ID in the format YNAB uses for its own file imports,
+"YNAB:<milliunits>:<date>:<occurrence>", so sending the same transactions again creates no
+duplicates: YNAB reports them as already imported instead.
+"""
+
+import http.client
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from queue import Empty, LifoQueue
+from typing import Self
+from urllib.parse import SplitResult, urlsplit
+
+import pandas as pd
+from loguru import logger
+
+from ynab_format_csv.exceptions import UploadError
+from ynab_format_csv.mapping import amount_in_cents
+from ynab_format_csv.validation import parse_dates
+
+DEFAULT_BASE_URL: str = "https://api.ynab.com/v1"
+DEFAULT_BATCH_SIZE: int = 500
+DEFAULT_WORKERS: int = 4
+DEFAULT_RETRIES: int = 5
+DEFAULT_TIMEOUT: float = 30.0
+
+# The longest values the API accepts for these fields
+MAX_PAYEE_LENGTH: int = 200
+MAX_MEMO_LENGTH: int = 500
+
+RETRY_STATUSES: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of keep-alive HTTP connections to a single host.
+
+    Connections are created on demand, up to one per concurrent caller, and returned to the
+    pool after each request so later requests reuse them instead of opening new ones.
+
+    Attributes
+    ----------
+    url : SplitResult
+        The parsed base URL of the API.
+    host : str
+        The host name of the API.
+    timeout : float
+        The timeout of each connection, in seconds.
+    """
+
+    def __init__(self, base_url: str, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.url: SplitResult = urlsplit(base_url.rstrip("/"))
+        hostname: str | None = self.url.hostname
+        if self.url.scheme not in ("http", "https") or not hostname:
+            raise UploadError(f"Invalid YNAB API base URL: {base_url}")
+        self.host: str = hostname
+        self.timeout: float = timeout
+        self._idle: LifoQueue[http.client.HTTPConnection] = LifoQueue()
+
+    def get(self) -> http.client.HTTPConnection:
+        """Return an idle connection, or a new one if none is idle."""
+
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            connection_class: type[http.client.HTTPConnection] = (
+                http.client.HTTPSConnection if self.url.scheme == "https" else http.client.HTTPConnection
+            )
+            return connection_class(self.host, self.url.port, timeout=self.timeout)
+
+    def put(self, connection: http.client.HTTPConnection) -> None:
+        """Return a connection to the pool for reuse."""
+
+        self._idle.put(connection)
+
+        return None
+
+    def close(self) -> None:
+        """Close every idle connection."""
+
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return None
+
+
+def ynab_transactions(df: pd.DataFrame, account_id: str, occurrences: dict[str, int] | None = None) -> list[dict]:
+    """
+    Convert validated YNAB rows into transaction objects for the YNAB API.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Validated transaction data, with the YNAB field names as columns.
+    account_id : str
+        The ID of the YNAB account the transactions belong to.
+    occurrences : dict[str, int], optional
+        The number of transactions already seen for each "<milliunits>:<date>" pair. It is used
+        to number repeated transactions in their import IDs, and updated in place, so import IDs
+        stay unique across batches when the same dict is passed for each one.
+
+    Returns
+    -------
+    list[dict]
+        The transactions, each with account_id, date, amount (in milliunits), payee_name, memo
+        and import_id.
+    """
+
+    if df.empty:
+        return []
+
+    occurrences = occurrences if occurrences is not None else {}
+    dates: pd.Series = parse_dates(df["Date"]).dt.strftime("%Y-%m-%d")
+    milliunits: pd.Series = amount_in_cents(df) * 10
+
+    # Number repeated amount/date pairs 1, 2, 3... in file order, carrying on from earlier batches
+    keys: pd.Series = milliunits.astype(str) + ":" + dates
+    occurrence: pd.Series = keys.groupby(keys, sort=False).cumcount() + 1 + keys.map(occurrences).fillna(0).astype(int)
+    occurrences.update(occurrence.groupby(keys, sort=False).max().to_dict())
+
+    transactions: pd.DataFrame = pd.DataFrame(
+        {
+            "account_id": account_id,
+            "date": dates,
+            "amount": milliunits,
+            "payee_name": text_field(df, "Payee", MAX_PAYEE_LENGTH),
+            "memo": text_field(df, "Memo", MAX_MEMO_LENGTH),
+            "import_id": "YNAB:" + keys + ":" + occurrence.astype(str),
+        },
+        index=df.index,
+    )
+
+    return transactions.to_dict(orient="records")
+
+
+def text_field(df: pd.DataFrame, column: str, max_length: int) -> pd.Series:
+    """
+    Return a text column truncated to the API's maximum length, with blanks as None.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Validated transaction data.
+    column : str
+        The column to return.
+    max_length : int
+        The maximum length the API accepts for the field.
+
+    Returns
+    -------
+    pd.Series
+        The values as objects: strings, or None where the column is missing or blank.
+    """
+
+    if column not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+    text: pd.Series = df[column].fillna("").astype(str).str.strip().str.slice(0, max_length)
+
+    return text.astype(object).where(text.ne(""), None)
+
+
+class YnabUploader:
+    """
+    Post transactions to a YNAB account in concurrent, size-limited batches.
+
+    Batches are sent in the background as they are added; close() waits for them all and raises
+    the first error. Use it as a context manager: if the block raises, the batches not yet sent are
+    cancelled instead, so the original error is not hidden by an upload error.
+
+    Attributes
+    ----------
+    budget_id : str
+        The ID of the YNAB budget.
+    account_id : str
+        The ID of the account within the budget.
+    batch_size : int
+        The maximum number of transactions sent in one request.
+    max_retries : int
+        The number of times a rate-limited or failed request is retried.
+    backoff : float
+        The delay before the first retry, in seconds; it doubles with every retry.
+    created : int
+        The number of transactions YNAB has created, counted as requests are collected; it is
+        complete once close() returns.
+    duplicates : int
+        The number of transactions YNAB has ignored because their import ID was already used,
+        counted in the same way.
+    """
+
+    def __init__(
+        self,
+        budget_id: str,
+        account_id: str,
+        token: str,
+        base_url: str = DEFAULT_BASE_URL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = DEFAULT_WORKERS,
+        max_retries: int = DEFAULT_RETRIES,
+        backoff: float = 1.0,
+    ) -> None:
+        self.budget_id: str = budget_id
+        self.account_id: str = account_id
+        self.batch_size: int = batch_size
+        self.max_retries: int = max_retries
+        self.backoff: float = backoff
+        self.created: int = 0
+        self.duplicates: int = 0
+        self._token: str = token
+        self._pool: ConnectionPool = ConnectionPool(base_url)
+        self._path: str = f"{self._pool.url.path}/budgets/{budget_id}/transactions"
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers, thread_name_prefix="ynab-upload")
+        self._max_pending: int = max_workers * 2
+        self._pending: set[Future] = set()
+        self._occurrences: dict[str, int] = {}
+
+    def upload(self, df: pd.DataFrame) -> None:
+        """
+        Queue a batch of validated YNAB rows for upload.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Validated transaction data, with the YNAB field names as columns.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        UploadError
+            If an earlier request has failed.
+        """
+
+        transactions: list[dict] = ynab_transactions(df, self.account_id, self._occurrences)
+
+        for start in range(0, len(transactions), self.batch_size):
+            # Keep a bounded number of requests in flight, so a large file isn't held in memory
+            while len(self._pending) >= self._max_pending:
+                done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._count(future)
+            self._pending.add(self._executor.submit(self._post, transactions[start : start + self.batch_size]))
+
+        return None
+
+    def close(self) -> None:
+        """
+        Wait for every queued batch to be sent, then close the connections.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        UploadError
+            If any request failed.
+        """
+
+        try:
+            for future in self._pending:
+                self._count(future)
+        finally:
+            self.abort()
+
+        return None
+
+    def abort(self) -> None:
+        """Cancel the queued batches that haven't been sent, then close the connections."""
+
+        self._pending = set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._pool.close()
+
+        return None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _count(self, future: Future) -> None:
+        """Add the counts of a finished request to the totals, raising its error if it failed."""
+
+        # Only the calling thread updates the totals, so they need no lock
+        created, duplicates = future.result()
+        self.created += created
+        self.duplicates += duplicates
+
+        return None
+
+    def _post(self, transactions: list[dict]) -> tuple[int, int]:
+        """
+        Send one batch of transactions, retrying rate-limited and failed requests.
+
+        Returns the number of transactions created and the number ignored as duplicates.
+        """
+
+        body: bytes = json.dumps({"transactions": transactions}).encode()
+        headers: dict[str, str] = {
+            "Authorization": f"Bearer {self._token}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+
+        for attempt in range(self.max_retries + 1):
+            delay: float = self.backoff * 2**attempt
+            connection: http.client.HTTPConnection = self._pool.get()
+            try:
+                connection.request("POST", self._path, body=body, headers=headers)
+                response: http.client.HTTPResponse = connection.getresponse()
+                payload: bytes = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                # The connection may have been dropped by the server; retry on a fresh one
+                connection.close()
+                if attempt == self.max_retries:
+                    raise UploadError(f"Error connecting to the YNAB API: {e}") from e
+                logger.debug(f"YNAB API request failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._pool.put(connection)
+
+            if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                delay = retry_after(response, delay)
+                logger.debug(f"YNAB API returned {response.status}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status >= 400:
+                raise UploadError(f"The YNAB API rejected the upload ({response.status}): {error_detail(payload)}")
+
+            try:
+                data: dict = json.loads(payload or b"{}").get("data", {})
+            except (ValueError, AttributeError) as e:
+                raise UploadError(f"Unexpected response from the YNAB API: {payload[:200]!r}") from e
+            created: int = len(data.get("transaction_ids") or [])
+            duplicates: int = len(data.get("duplicate_import_ids") or [])
+            logger.debug(f"Uploaded {len(transactions)} transactions to YNAB ({duplicates} already imported)")
+
+            return created, duplicates
+
+        return 0, 0
+
+
+def retry_after(response: http.client.HTTPResponse, default: float) -> float:
+    """
+    Return the delay requested by a response's Retry-After header, in seconds.
+
+    Parameters
+    ----------
+    response : http.client.HTTPResponse
+        The rate-limited or failed response.
+    default : float
+        The delay to use if the header is missing or is not a number of seconds.
+
+    Returns
+    -------
+    float
+        The delay before retrying, in seconds.
+    """
+
+    try:
+        return max(float(response.getheader("Retry-After", "")), 0.0)
+    except ValueError:
+        return default
+
+
+def error_detail(payload: bytes) -> str:
+    """
+    Extract the error message from a YNAB API error response.
+
+    Parameters
+    ----------
+    payload : bytes
+        The body of the response.
+
+    Returns
+    -------
+    str
+        The error's name and detail, or the raw body if it is not a YNAB error object.
+    """
+
+    try:
+        error: dict = json.loads(payload)["error"]
+        return f"{error.get('name', '')}: {error.get('detail', '')}"
+    except (ValueError, KeyError, TypeError):
+        return payload.decode(errors="replace")[:200]
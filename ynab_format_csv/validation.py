@@ -0,0 +1,366 @@
+"""
+Row-level validation of mapped YNAB transactions.
+
+Every rule is evaluated as a boolean mask over whole columns, so the cost of
+validation grows with the number of columns checked, not with Python-level
+work per row.
+"""
+
+import warnings
+from collections import Counter
+from dataclasses import dataclass, field
+
+import pandas as pd
+from loguru import logger
+from pandas.tseries.api import guess_datetime_format  # pyright: ignore[reportAttributeAccessIssue]
+
+# Failure reasons reported in the quarantine file and the validation summary
+MISSING_DATE: str = "Missing Date"
+INVALID_DATE: str = "Unparseable Date"
+INVALID_AMOUNT: str = "Non-numeric Amount"
+INVALID_OUTFLOW: str = "Non-numeric Outflow"
+INVALID_INFLOW: str = "Non-numeric Inflow"
+OUTFLOW_AND_INFLOW: str = "Both Outflow and Inflow set"
+MISSING_FX_RATE: str = "No FX rate for Currency"
+
+# Columns prepended to quarantined rows
+LINE_COLUMN: str = "Line"
+REASON_COLUMN: str = "Reason"
+# Also prepended when several files are converted together
+FILE_COLUMN: str = "File"
+
+# Date formats tried, alongside pandas' own guess, when inferring the format of a Date column.
+# When dates fit several of them, month-first formats are preferred, then pandas' guess.
+MONTH_FIRST_FORMATS: tuple[str, ...] = ("%m/%d/%Y", "%m/%d/%y")
+DATE_FORMATS: tuple[str, ...] = (*MONTH_FIRST_FORMATS, "%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%Y/%m/%d", "%d.%m.%Y")
+
+# Valid dates are rewritten in this format, so every later step reads them without ambiguity
+DATE_OUTPUT_FORMAT: str = "%Y-%m-%d"
+
+# The CSV header occupies line 1, so the line directly after it (line offset 0) is line 2
+HEADER_LINES: int = 1
+
+
+@dataclass
+class ValidationResult:
+    """
+    The outcome of validating a DataFrame of mapped transactions.
+
+    Attributes
+    ----------
+    valid : pd.DataFrame
+        The rows that passed every rule, with amount columns normalized to numbers and dates
+        to DATE_OUTPUT_FORMAT.
+    invalid : pd.DataFrame
+        The rows that failed at least one rule, prefixed with the original line number
+        and the reason(s) for the failure.
+    reasons : Counter
+        The number of rows failing each rule. A row failing several rules is counted once per rule.
+    """
+
+    valid: pd.DataFrame
+    invalid: pd.DataFrame
+    reasons: Counter = field(default_factory=Counter)
+
+
+@dataclass
+class ValidationSummary:
+    """
+    Running totals of the validation results across every batch of a conversion.
+
+    Attributes
+    ----------
+    valid_rows : int
+        The number of rows that passed validation.
+    invalid_rows : int
+        The number of rows that were quarantined.
+    reasons : Counter
+        The number of rows failing each rule.
+    """
+
+    valid_rows: int = 0
+    invalid_rows: int = 0
+    reasons: Counter = field(default_factory=Counter)
+
+    def update(self, result: ValidationResult) -> None:
+        """
+        Add the counts from a single validated batch to the totals.
+
+        Parameters
+        ----------
+        result : ValidationResult
+            The outcome of validating one batch of rows.
+
+        Returns
+        -------
+        None
+        """
+
+        self.valid_rows += len(result.valid)
+        self.invalid_rows += len(result.invalid)
+        self.reasons.update(result.reasons)
+
+        return None
+
+
+def line_description(label: int | tuple[str, int]) -> str:
+    """
+    Describe where in the input a row came from, for log messages.
+
+    Parameters
+    ----------
+    label : int | tuple[str, int]
+        The row's index label: its line offset in the CSV file, or a (file, line offset) pair for
+        rows merged from several files.
+
+    Returns
+    -------
+    str
+        E.g. "line 5", or "2024-01.csv line 5".
+    """
+
+    if isinstance(label, tuple):
+        file_name, offset = label
+        return f"{file_name} line {offset + HEADER_LINES + 1}"
+
+    return f"line {label + HEADER_LINES + 1}"
+
+
+def is_blank(series: pd.Series) -> pd.Series:
+    """
+    Return a mask of the values that are missing or contain only whitespace.
+
+    Parameters
+    ----------
+    series : pd.Series
+        The column to check.
+
+    Returns
+    -------
+    pd.Series
+        A boolean mask, True where the value is blank.
+    """
+
+    blank: pd.Series = series.isna()
+    if not pd.api.types.is_numeric_dtype(series):
+        blank |= series.astype(str).str.strip().eq("")
+
+    return blank
+
+
+def infer_date_format(series: pd.Series) -> str | None:
+    """
+    Infer the single date format used by a column of dates.
+
+    Every distinct value is tried against pandas' guess and each of DATE_FORMATS, and the format
+    that parses the most values wins. Formats that parse equally many values but disagree on a date
+    make the column ambiguous, e.g. dates whose days are all 12 or less fit both "%m/%d/%Y" and
+    "%d/%m/%Y". A warning is logged and the first of them in the order of MONTH_FIRST_FORMATS,
+    pandas' guess, then DATE_FORMATS is used; set the Date field's date_format to override it.
+
+    Parameters
+    ----------
+    series : pd.Series
+        The column of dates, as read from the CSV file.
+
+    Returns
+    -------
+    str | None
+        The date format, or None if the column is blank or no format parses any of its values.
+    """
+
+    values: pd.Series = pd.Series(series.dropna().astype(str).str.strip().unique())
+    values = values[values.ne("")]
+    if values.empty:
+        return None
+
+    # The guess is only one candidate among several, so its day-first warning doesn't apply
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        guessed: str | None = guess_datetime_format(values.iloc[0])
+    candidates: list[str] = [
+        date_format for date_format in dict.fromkeys((*MONTH_FIRST_FORMATS, guessed, *DATE_FORMATS)) if date_format
+    ]
+    parsed: dict[str, pd.Series] = {
+        date_format: pd.to_datetime(values, format=date_format, errors="coerce") for date_format in candidates
+    }
+    counts: dict[str, int] = {date_format: int(dates.notna().sum()) for date_format, dates in parsed.items()}
+
+    best: int = max(counts.values())
+    if best == 0:
+        return None
+
+    fits: list[str] = [date_format for date_format in candidates if counts[date_format] == best]
+    for date_format in fits[1:]:
+        if not parsed[date_format].equals(parsed[fits[0]]):
+            logger.warning(
+                f"The dates are ambiguous: they fit both {fits[0]} and {date_format} "
+                f"(e.g. {values[parsed[date_format].ne(parsed[fits[0]])].iloc[0]}). Using {fits[0]}; "
+                "set the date_format of the Date field in the mapping file if that is wrong."
+            )
+            break
+
+    return fits[0]
+
+
+def parse_dates(series: pd.Series, date_format: str | None = None) -> pd.Series:
+    """
+    Parse a column of dates, returning NaT for values that cannot be parsed.
+
+    A single date format is applied to the whole column, which keeps parsing vectorized.
+    If none is given, it is inferred from the column with infer_date_format().
+
+    Parameters
+    ----------
+    series : pd.Series
+        The column of dates, as read from the CSV file.
+    date_format : str, optional
+        The strptime format of the dates. Values that don't match it are returned as NaT.
+
+    Returns
+    -------
+    pd.Series
+        The parsed dates.
+    """
+
+    if date_format is None:
+        date_format = infer_date_format(series)
+
+    if date_format is None:
+        # No single known format fits any value, so fall back to parsing each value individually
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            return pd.to_datetime(series, format="mixed", errors="coerce")
+
+    return pd.to_datetime(series, format=date_format, errors="coerce")
+
+
+def parse_amounts(series: pd.Series) -> pd.Series:
+    """
+    Parse a column of currency amounts, returning NaN for values that are not numeric.
+
+    Currency symbols, thousands separators and accounting-style parentheses
+    (e.g. "(1,234.50)") are accepted.
+
+    Parameters
+    ----------
+    series : pd.Series
+        The column of amounts, as read from the CSV file.
+
+    Returns
+    -------
+    pd.Series
+        The parsed amounts as floats.
+    """
+
+    if not pd.api.types.is_numeric_dtype(series):
+        series = (
+            series.astype("string")
+            .str.strip()
+            .str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+            .str.replace(r"[$,\s]", "", regex=True)
+        )
+
+    return pd.to_numeric(series, errors="coerce").astype(float)
+
+
+def validate_dataframe(df: pd.DataFrame, date_format: str | None = None) -> ValidationResult:
+    """
+    Check every row of the mapped transaction data against the YNAB import rules.
+
+    The rules applied are:
+    - Date must be present and parseable
+    - Amount, Outflow and Inflow must be numeric when present
+    - Outflow and Inflow must not both be set (non-zero) on the same row
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The transaction data, with columns already renamed to the YNAB fields.
+        The index is expected to be the line offset of each row in the original CSV file.
+    date_format : str, optional
+        The strptime format of the Date column. If not given, it is inferred from the column.
+
+    Returns
+    -------
+    ValidationResult
+        The valid rows, the quarantined rows and the failure counts by reason.
+    """
+
+    failures: dict[str, pd.Series] = {}
+    amounts: dict[str, pd.Series] = {}
+    dates: pd.Series | None = None
+
+    if "Date" in df.columns:
+        missing_date: pd.Series = is_blank(df["Date"])
+        dates = parse_dates(df["Date"], date_format)
+        failures[MISSING_DATE] = missing_date
+        failures[INVALID_DATE] = ~missing_date & dates.isna()
+    else:
+        failures[MISSING_DATE] = pd.Series(True, index=df.index)
+
+    for column, rule in (("Amount", INVALID_AMOUNT), ("Outflow", INVALID_OUTFLOW), ("Inflow", INVALID_INFLOW)):
+        if column not in df.columns:
+            continue
+        amounts[column] = parse_amounts(df[column])
+        failures[rule] = ~is_blank(df[column]) & amounts[column].isna()
+
+    if "Outflow" in amounts and "Inflow" in amounts:
+        outflow_set: pd.Series = amounts["Outflow"].fillna(0).ne(0)
+        inflow_set: pd.Series = amounts["Inflow"].fillna(0).ne(0)
+        failures[OUTFLOW_AND_INFLOW] = outflow_set & inflow_set
+
+    failed: pd.DataFrame = pd.DataFrame(failures, index=df.index)
+    invalid_mask: pd.Series = failed.any(axis=1)
+
+    valid: pd.DataFrame = df.loc[~invalid_mask].copy()
+    for column, parsed in amounts.items():
+        valid[column] = parsed.loc[~invalid_mask]
+    if dates is not None:
+        valid["Date"] = dates.loc[~invalid_mask].dt.strftime(DATE_OUTPUT_FORMAT)
+
+    # Join the names of the failed rules into a single reason per row, e.g. "Missing Date; Non-numeric Amount"
+    failed_rows: pd.DataFrame = failed.loc[invalid_mask]
+    labels: pd.Series = pd.Series([f"{name}; " for name in failed_rows.columns], index=failed_rows.columns)
+    reason: pd.Series = failed_rows.dot(labels).str.rstrip("; ")
+
+    invalid: pd.DataFrame = df.loc[invalid_mask].copy()
+    invalid.insert(0, REASON_COLUMN, reason)
+    invalid.insert(0, LINE_COLUMN, invalid.index + HEADER_LINES + 1)
+
+    reasons: Counter = Counter({name: int(count) for name, count in failed.sum().items() if count})
+
+    return ValidationResult(valid=valid, invalid=invalid, reasons=reasons)
+
+
+def quarantine_rows(result: ValidationResult, mask: pd.Series, reason: str) -> ValidationResult:
+    """
+    Move valid rows that fail a later check into the quarantined rows.
+
+    Parameters
+    ----------
+    result : ValidationResult
+        The outcome of validating a batch.
+    mask : pd.Series
+        A boolean mask over `result.valid`, True for the rows to quarantine.
+    reason : str
+        The reason recorded for the quarantined rows.
+
+    Returns
+    -------
+    ValidationResult
+        A new result with the masked rows moved from `valid` to `invalid`.
+    """
+
+    if not mask.any():
+        return result
+
+    failed: pd.DataFrame = result.valid.loc[mask].copy()
+    failed.insert(0, REASON_COLUMN, reason)
+    failed.insert(0, LINE_COLUMN, failed.index + HEADER_LINES + 1)
+
+    frames: list[pd.DataFrame] = [frame for frame in (result.invalid, failed) if not frame.empty]
+    invalid: pd.DataFrame = pd.concat(frames).sort_values(LINE_COLUMN, kind="mergesort")
+    reasons: Counter = result.reasons + Counter({reason: int(mask.sum())})
+
+    return ValidationResult(valid=result.valid.loc[~mask], invalid=invalid, reasons=reasons)